@@ -1,17 +1,16 @@
 import sys
 import os
 import json
-import zipfile
 from PyQt5.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel,
     QLineEdit, QFileDialog, QTabWidget, QMessageBox, QListWidget, QProgressBar,
-    QAbstractItemView, QCheckBox
+    QAbstractItemView, QCheckBox, QListWidgetItem
 )
-from PyQt5.QtCore import Qt, QMimeData
+from PyQt5.QtCore import Qt, QMimeData, QTimer
 from PyQt5.QtGui import QFont, QDragEnterEvent, QDropEvent
 import bt1module
+import bt1jobs
 import shutil
-import tempfile
 
 CONFIG_FILE = ".bt1config.json"
 
@@ -20,7 +19,7 @@ def load_config():
     if os.path.exists(CONFIG_FILE):
         with open(CONFIG_FILE, "r") as f:
             return json.load(f)
-    return {"password": "test1", "salt": "", "dark_mode": False}
+    return {"password": "test1", "salt": "", "dark_mode": False, "max_jobs": 2}
 
 # Save configuration to file
 def save_config(cfg):
@@ -51,8 +50,17 @@ class BT1GUI(QWidget):
         self.setWindowTitle("BT1 GUI PyQt V2")
         self.resize(700, 500)
         self.config = load_config()
+        self.jobs = bt1jobs.JobQueue(self.config.get("max_jobs", 2))
+        self.job_items = {}
+        self.last_pack_job = None
+        self.last_unpack_job = None
         self.initUI()
 
+        # Poll the job queue so the window never blocks on a running job
+        self.job_timer = QTimer(self)
+        self.job_timer.timeout.connect(self.refresh_jobs)
+        self.job_timer.start(200)
+
     # Initialize the UI components
     def initUI(self):
         layout = QVBoxLayout()
@@ -61,10 +69,12 @@ class BT1GUI(QWidget):
         # Tabs for different sections
         self.tab_pack = QWidget()
         self.tab_unpack = QWidget()
+        self.tab_jobs = QWidget()
         self.tab_settings = QWidget()
 
         self.tabs.addTab(self.tab_pack, "📦 Pack Files")
         self.tabs.addTab(self.tab_unpack, "🧹 Unpack")
+        self.tabs.addTab(self.tab_jobs, "📋 Jobs")
         self.tabs.addTab(self.tab_settings, "⚙️ Settings")
 
         layout.addWidget(self.tabs)
@@ -72,6 +82,7 @@ class BT1GUI(QWidget):
 
         self.init_pack_tab()
         self.init_unpack_tab()
+        self.init_jobs_tab()
         self.init_settings_tab()
 
     # Initialize the "Pack Files" tab
@@ -103,9 +114,11 @@ class BT1GUI(QWidget):
         h2.addWidget(btn_browse_out)
         layout.addLayout(h2)
 
-        # Progress bar
+        # Progress bar and throughput
         self.progress = QProgressBar()
+        self.progress_label = QLabel()
         layout.addWidget(self.progress)
+        layout.addWidget(self.progress_label)
 
         # Pack button
         btn_pack = QPushButton("🚀 Pack")
@@ -126,32 +139,23 @@ class BT1GUI(QWidget):
         if path:
             self.outfile_entry.setText(path)
 
-    # Pack the selected files
+    # Queue a pack job for the selected files: each one becomes a member of a
+    # multi-member archive, streamed straight into the output
     def pack_files(self):
         files = [self.file_list.item(i).text() for i in range(self.file_list.count())]
         if not files:
             return QMessageBox.warning(self, "Error", "No files to pack.")
+        names = [os.path.basename(f) for f in files]
+        if len(set(names)) != len(names):
+            return QMessageBox.warning(self, "Error", "Two selected files have the same name.")
 
         output = self.outfile_entry.text()
         if not output:
             return QMessageBox.warning(self, "Error", "Output file not selected.")
 
-        self.progress.setValue(10)
-
-        # Create a temporary ZIP file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as tmpzip:
-            with zipfile.ZipFile(tmpzip.name, "w") as zf:
-                for file in files:
-                    zf.write(file, arcname=os.path.basename(file))
-        self.progress.setValue(30)
-
-        # Pack files using the BT1 module
-        try:
-            bt1module.bt1_pack_file(tmpzip.name, output, self.config["password"])
-            self.progress.setValue(100)
-            QMessageBox.information(self, "Done", f"Packed into: {output}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+        self.last_pack_job = self.jobs.submit("pack", bt1module.bt1_pack_many, files, output, self.config["password"],
+                                              label=os.path.basename(output))
+        self.tabs.setCurrentWidget(self.tab_jobs)
 
     # Initialize the "Unpack" tab
     def init_unpack_tab(self):
@@ -175,9 +179,11 @@ class BT1GUI(QWidget):
         h2.addWidget(btn_outdir)
         layout.addLayout(h2)
 
-        # Unpack progress bar
+        # Unpack progress bar and throughput
         self.unpack_progress = QProgressBar()
+        self.unpack_label = QLabel()
         layout.addWidget(self.unpack_progress)
+        layout.addWidget(self.unpack_label)
 
         # Unpack button
         btn_unpack = QPushButton("🔓 Unpack")
@@ -196,13 +202,64 @@ class BT1GUI(QWidget):
         if not os.path.isdir(outdir):
             return QMessageBox.warning(self, "Error", "Invalid output directory.")
 
-        try:
-            self.unpack_progress.setValue(10)
-            bt1module.bt1_unpack_file(infile, outdir, self.config["password"])
-            self.unpack_progress.setValue(100)
-            QMessageBox.information(self, "Done", f"Unpacked to: {outdir}")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", str(e))
+        self.last_unpack_job = self.jobs.submit("unpack", bt1module.bt1_unpack_file, infile, outdir, self.config["password"],
+                                                label=os.path.basename(infile))
+        self.tabs.setCurrentWidget(self.tab_jobs)
+
+    # Initialize the "Jobs" tab
+    def init_jobs_tab(self):
+        layout = QVBoxLayout()
+
+        self.job_list = QListWidget()
+        self.job_list.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        btn_cancel = QPushButton("⛔ Cancel Selected")
+        btn_cancel.clicked.connect(self.cancel_jobs)
+        btn_clear = QPushButton("🧽 Clear Finished")
+        btn_clear.clicked.connect(self.clear_jobs)
+
+        layout.addWidget(QLabel("📋 Queued and running jobs:"))
+        layout.addWidget(self.job_list)
+
+        h1 = QHBoxLayout()
+        h1.addWidget(btn_cancel)
+        h1.addWidget(btn_clear)
+        layout.addLayout(h1)
+
+        self.tab_jobs.setLayout(layout)
+
+    # Redraw job status and the progress bars of the latest jobs
+    def refresh_jobs(self):
+        for job in self.jobs.jobs():
+            item = self.job_items.get(job.id)
+            if item is None:
+                item = self.job_items[job.id] = QListWidgetItem()
+                item.setData(Qt.UserRole, job.id)
+                self.job_list.addItem(item)
+            item.setText(job.describe())
+
+        for job, bar, label in ((self.last_pack_job, self.progress, self.progress_label),
+                                (self.last_unpack_job, self.unpack_progress, self.unpack_label)):
+            if job is not None:
+                bar.setValue(job.percent)
+                label.setText(job.describe())
+
+    # Cancel the selected jobs
+    def cancel_jobs(self):
+        for item in self.job_list.selectedItems():
+            self.jobs.cancel(item.data(Qt.UserRole))
+
+    # Remove finished jobs from the list
+    def clear_jobs(self):
+        self.jobs.clear_finished()
+        live = {job.id for job in self.jobs.jobs()}
+        for job_id in list(self.job_items):
+            if job_id not in live:
+                self.job_list.takeItem(self.job_list.row(self.job_items.pop(job_id)))
+
+    # Cancel outstanding jobs when the window closes
+    def closeEvent(self, event):
+        self.jobs.shutdown()
+        super().closeEvent(event)
 
     # Initialize the "Settings" tab
     def init_settings_tab(self):
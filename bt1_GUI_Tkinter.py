@@ -2,6 +2,7 @@ import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import os, json
 import bt1module
+import bt1jobs
 
 CONFIG_FILE = ".bt1config.json"
 
@@ -10,7 +11,7 @@ def load_config():
     if os.path.exists(CONFIG_FILE):
         with open(CONFIG_FILE, 'r') as f:
             return json.load(f)
-    return {"password": "test1", "salt": "", "dark_mode": False}
+    return {"password": "test1", "salt": "", "dark_mode": False, "max_jobs": 2}
 
 # Save configuration to file
 def save_config():
@@ -19,6 +20,8 @@ def save_config():
 
 # ==== Initial Config ====
 global_config = load_config()
+job_queue = bt1jobs.JobQueue(global_config.get("max_jobs", 2))
+last_jobs = {"pack": None, "unpack": None}
 
 # ==== Dark Mode Handling ====
 def apply_theme():
@@ -65,16 +68,14 @@ def get_salt():
         return None
 
 # ==== Pack and Unpack Functions ====
+# Both queue a background job; poll_jobs() redraws their status.
 def pack_file():
     in_path = entry_pack_input.get()
     out_path = entry_pack_output.get()
     if not os.path.isfile(in_path):
         return messagebox.showerror("Error", "Input file does not exist")
-    try:
-        bt1module.bt1_pack_file(in_path, out_path, global_config['password'])
-        messagebox.showinfo("Done", f"Packed: {out_path}")
-    except Exception as e:
-        messagebox.showerror("Packing Error", str(e))
+    last_jobs["pack"] = job_queue.submit("pack", bt1module.bt1_pack_file, in_path, out_path, global_config['password'],
+                                         label=os.path.basename(out_path))
 
 def unpack_file():
     in_path = entry_unpack_input.get()
@@ -83,22 +84,50 @@ def unpack_file():
         return messagebox.showerror("Error", "Input file does not exist")
     if not os.path.isdir(out_dir):
         return messagebox.showerror("Error", "Invalid output directory")
-    try:
-        bt1module.bt1_unpack_file(in_path, out_dir, global_config['password'])
-        messagebox.showinfo("Done", f"Unpacked to: {out_dir}")
-    except Exception as e:
-        messagebox.showerror("Unpacking Error", str(e))
+    last_jobs["unpack"] = job_queue.submit("unpack", bt1module.bt1_unpack_file, in_path, out_dir, global_config['password'],
+                                           label=os.path.basename(in_path))
+
+# ==== Job Queue Polling ====
+def poll_jobs():
+    jobs = job_queue.jobs()
+    lines = [job.describe() for job in jobs]
+    if list(job_listbox.get(0, tk.END)) != lines:
+        selected = set(job_listbox.curselection())
+        job_listbox.delete(0, tk.END)
+        for i, line in enumerate(lines):
+            job_listbox.insert(tk.END, line)
+            if i in selected:
+                job_listbox.selection_set(i)
+
+    for kind, bar, label in (("pack", pack_bar, pack_status), ("unpack", unpack_bar, unpack_status)):
+        job = last_jobs[kind]
+        if job is not None:
+            bar["value"] = job.percent
+            label.config(text=job.describe())
+    root.after(200, poll_jobs)
+
+def cancel_jobs():
+    jobs = job_queue.jobs()
+    for i in job_listbox.curselection():
+        if i < len(jobs):
+            jobs[i].cancel()
+
+def on_close():
+    job_queue.shutdown()
+    root.destroy()
 
 # ==== GUI Setup ====
 root = tk.Tk()
 root.title("BT1 GUI Encrypt Tool")
-root.geometry("560x320")
+root.geometry("600x360")
 notebook = ttk.Notebook(root)
 frame_pack = tk.Frame(notebook, padx=10, pady=10)
 frame_unpack = tk.Frame(notebook, padx=10, pady=10)
+frame_jobs = tk.Frame(notebook, padx=10, pady=10)
 frame_setting = tk.Frame(notebook, padx=10, pady=10)
 notebook.add(frame_pack, text="📦 Pack Files")
 notebook.add(frame_unpack, text="🧹 Unpack")
+notebook.add(frame_jobs, text="📋 Jobs")
 notebook.add(frame_setting, text="⚙️ Settings")
 notebook.pack(fill="both", expand=True)
 
@@ -114,6 +143,10 @@ entry_pack_output.grid(row=3, column=0)
 tk.Button(frame_pack, text="Choose", command=lambda: pick_output_file(entry_pack_output)).grid(row=3, column=1)
 
 tk.Button(frame_pack, text="🚀 Pack File", command=pack_file).grid(row=4, column=0, pady=10)
+pack_bar = ttk.Progressbar(frame_pack, length=400, maximum=100)
+pack_bar.grid(row=5, column=0, columnspan=2, sticky="we")
+pack_status = tk.Label(frame_pack, text="")
+pack_status.grid(row=6, column=0, sticky="w")
 
 # === Unpack Tab ===
 tk.Label(frame_unpack, text="Input .bt1 File:").grid(row=0, column=0, sticky="w")
@@ -127,6 +160,17 @@ entry_unpack_output.grid(row=3, column=0)
 tk.Button(frame_unpack, text="Choose", command=lambda: pick_folder(entry_unpack_output)).grid(row=3, column=1)
 
 tk.Button(frame_unpack, text="🔓 Unpack", command=unpack_file).grid(row=4, column=0, pady=10)
+unpack_bar = ttk.Progressbar(frame_unpack, length=400, maximum=100)
+unpack_bar.grid(row=5, column=0, columnspan=2, sticky="we")
+unpack_status = tk.Label(frame_unpack, text="")
+unpack_status.grid(row=6, column=0, sticky="w")
+
+# === Jobs Tab ===
+tk.Label(frame_jobs, text="Queued and running jobs:").grid(row=0, column=0, sticky="w")
+job_listbox = tk.Listbox(frame_jobs, width=70, height=8, selectmode=tk.EXTENDED)
+job_listbox.grid(row=1, column=0, columnspan=2)
+tk.Button(frame_jobs, text="⛔ Cancel Selected", command=cancel_jobs).grid(row=2, column=0, pady=10)
+tk.Button(frame_jobs, text="🧽 Clear Finished", command=job_queue.clear_finished).grid(row=2, column=1, pady=10)
 
 # === Settings Tab ===
 tk.Label(frame_setting, text="🔐 Password:").grid(row=0, column=0, sticky="w")
@@ -169,5 +213,7 @@ tk.Button(frame_setting, text="🔄 Reset to Default", command=reset_settings).g
 
 # === Initialize Theme ===
 apply_theme()
+root.protocol("WM_DELETE_WINDOW", on_close)
+poll_jobs()
 root.mainloop()
 
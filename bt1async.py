@@ -0,0 +1,84 @@
+import asyncio
+import weakref
+import threading
+import functools
+from concurrent.futures import ThreadPoolExecutor
+import bt1module
+
+# ===== asyncio API =====
+# Each call runs the blocking bt1module function on an executor thread, so
+# neither its file I/O nor its crypto touches the event loop. A semaphore
+# bounds how many calls run at once. Cancelling the awaiting task makes the
+# call's next progress event raise bt1module.Cancelled; the task then waits
+# for the .part cleanup before re-raising CancelledError. Frame crypto can
+# additionally be spread over processes with workers=.
+#
+# The executor must run callables in this process (a thread pool): progress
+# callbacks and cancellation do not cross process boundaries. It is shared
+# by every event loop; the semaphore is per loop, since an asyncio.Semaphore
+# binds to the first loop that waits on it (each asyncio.run() is a new one).
+
+class BT1Async:
+    def __init__(self, max_concurrency: int = 4, executor=None):
+        self.max_concurrency = max_concurrency
+        self.executor = executor or ThreadPoolExecutor(max_concurrency, thread_name_prefix="bt1-async")
+        self._slots = weakref.WeakKeyDictionary()
+        self._slots_lock = threading.Lock()
+
+    def _slots_for(self, loop) -> asyncio.Semaphore:
+        with self._slots_lock:
+            slots = self._slots.get(loop)
+            if slots is None:
+                slots = self._slots[loop] = asyncio.Semaphore(self.max_concurrency)
+            return slots
+
+    async def _call(self, fn, *args, progress=None, **kwargs):
+        loop = asyncio.get_running_loop()
+        cancel = threading.Event()
+
+        def on_progress(event: dict):
+            if cancel.is_set():
+                raise bt1module.Cancelled()
+            if progress is not None:
+                loop.call_soon_threadsafe(progress, event)
+
+        async with self._slots_for(loop):
+            future = loop.run_in_executor(self.executor, functools.partial(fn, *args, progress=on_progress, **kwargs))
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                cancel.set()
+                try:
+                    await future
+                except (bt1module.Cancelled, Exception):
+                    pass
+                raise
+
+    async def pack(self, input_path: str, output_path: str, password: str = "test1", **kwargs):
+        return await self._call(bt1module.bt1_pack_file, input_path, output_path, password, **kwargs)
+
+    async def unpack(self, input_path: str, output_folder: str, password: str = "test1", **kwargs):
+        return await self._call(bt1module.bt1_unpack_file, input_path, output_folder, password, **kwargs)
+
+    async def pack_many(self, input_paths: list, output_path: str, password: str = "test1", **kwargs):
+        return await self._call(bt1module.bt1_pack_many, input_paths, output_path, password, **kwargs)
+
+    async def extract(self, archive_path: str, member: str, output_folder: str, password: str = "test1", **kwargs):
+        return await self._call(bt1module.bt1_extract, archive_path, member, output_folder, password, **kwargs)
+
+    def close(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+_default = None
+
+def _runner() -> BT1Async:
+    global _default
+    if _default is None:
+        _default = BT1Async()
+    return _default
+
+async def bt1_pack_async(input_path: str, output_path: str, password: str = "test1", **kwargs):
+    return await _runner().pack(input_path, output_path, password, **kwargs)
+
+async def bt1_unpack_async(input_path: str, output_folder: str, password: str = "test1", **kwargs):
+    return await _runner().unpack(input_path, output_folder, password, **kwargs)
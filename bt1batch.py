@@ -0,0 +1,152 @@
+import os
+import glob
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import bt1module
+
+# ===== Batch Pack/Unpack =====
+# Mirrors whole trees into .bt1 outputs (and back) on a process pool. Every
+# output is written through a .part file and renamed, so an existing output
+# is always complete: re-running after a crash or failure skips finished
+# files and retries the rest. Each worker keeps one KeySession, so the KDF
+# runs once per worker instead of once per file.
+
+_password = None
+_session = None
+
+def _init_worker(password: str, session_salt: bytes, kdf: dict = None):
+    global _password, _session
+    _password = password
+    _session = bt1module.KeySession(password, session_salt, kdf=kdf)
+
+def _up_to_date(source: str, target: str) -> bool:
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source)
+
+def collect(sources: list, manifest: str = None, base: str = None, suffix: str = "") -> list:
+    # Returns (path, relative path) pairs for directories, glob patterns and
+    # manifest entries (one path per line). Files outside base keep only
+    # their name.
+    base = os.path.abspath(base or os.getcwd())
+    patterns = list(sources)
+    if manifest:
+        with open(manifest, "r") as f:
+            patterns += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+
+    found = {}
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for root, _, files in os.walk(pattern):
+                for name in sorted(files):
+                    if name.endswith(suffix):
+                        path = os.path.join(root, name)
+                        found.setdefault(os.path.abspath(path), os.path.relpath(path, pattern))
+            continue
+        for path in sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]:
+            if os.path.isfile(path) and path.endswith(suffix):
+                path = os.path.abspath(path)
+                inside = os.path.commonpath([base, path]) == base
+                found.setdefault(path, os.path.relpath(path, base) if inside else os.path.basename(path))
+    return sorted(found.items(), key=lambda item: item[1])
+
+def _pack_one(source: str, target: str, codec: str, encryptor: str, force: bool):
+    if not force and _up_to_date(source, target):
+        return "skipped", 0, None
+    try:
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        bt1module.bt1_pack_file(source, target, _password, session=_session, codec=codec, encryptor=encryptor)
+        return "done", os.path.getsize(source), None
+    except Exception as e:
+        return "failed", 0, f"{type(e).__name__}: {e}".rstrip(": ")
+
+def _unpack_one(source: str, target_folder: str, force: bool):
+    try:
+        metadata = bt1module.bt1_inspect(source)["metadata"]
+        names = [metadata["filename"]] if "filename" in metadata else None
+        if not force and names and _up_to_date(source, os.path.join(target_folder, names[0])):
+            return "skipped", 0, None
+        os.makedirs(target_folder, exist_ok=True)
+        bt1module.bt1_unpack_file(source, target_folder, _password, session=_session)
+        return "done", os.path.getsize(source), None
+    except Exception as e:
+        return "failed", 0, f"{type(e).__name__}: {e}".rstrip(": ")
+
+def _verify_one(source: str, check_digest: bool):
+    try:
+        bt1module.bt1_verify(source, _password, session=_session, check_digest=check_digest)
+        return "done", os.path.getsize(source), None
+    except Exception as e:
+        return "failed", 0, f"{type(e).__name__}: {e}".rstrip(": ")
+
+def _claim_targets(tasks: list, target_of) -> tuple:
+    # Two sources with one output would race on its .part file, and a re-run
+    # would then skip the loser as up to date forever; every source of a
+    # shared output is failed instead. Returns (tasks, {source: error}).
+    owners = {}
+    for task in tasks:
+        target = target_of(task)
+        if target is not None:
+            owners.setdefault(os.path.normcase(os.path.abspath(target)), []).append(task[0])
+    clashes = {}
+    for target, sources in owners.items():
+        if len(sources) > 1:
+            for source in sources:
+                others = ", ".join(other for other in sources if other != source)
+                clashes[source] = f"Duplicate output {target} (also from {others})"
+    return [task for task in tasks if task[0] not in clashes], clashes
+
+def _unpack_target(task: tuple):
+    # None for multi-member archives (member names are encrypted) and for
+    # unreadable headers, which the worker reports.
+    try:
+        metadata = bt1module.bt1_inspect(task[0])["metadata"]
+    except (OSError, ValueError):
+        return None
+    return os.path.join(task[1], metadata["filename"]) if "filename" in metadata else None
+
+def _run(tasks: list, fn, password: str, jobs: int, log=print, kdf: dict = None, rejected: dict = None) -> dict:
+    summary = {"done": 0, "skipped": 0, "failed": 0, "bytes": 0, "errors": []}
+    start = time.perf_counter()
+    for source, error in sorted((rejected or {}).items()):
+        summary["failed"] += 1
+        summary["errors"].append((source, error))
+        if log:
+            log(f"[✘] {source}: {error}")
+    with ProcessPoolExecutor(max(1, jobs), initializer=_init_worker, initargs=(password, os.urandom(16), kdf)) as pool:
+        futures = {pool.submit(fn, *task): task[0] for task in tasks}
+        for future in as_completed(futures):
+            status, nbytes, error = future.result()
+            summary[status] += 1
+            summary["bytes"] += nbytes
+            if error:
+                summary["errors"].append((futures[future], error))
+                if log:
+                    log(f"[✘] {futures[future]}: {error}")
+    summary["seconds"] = time.perf_counter() - start
+    return summary
+
+def pack_tree(sources: list, output_dir: str, password: str = "test1", jobs: int = 1, manifest: str = None,
+              base: str = None, codec: str = "auto", force: bool = False, log=print,
+              encryptor: str = bt1module.DEFAULT_ENCRYPTOR, kdf: dict = None) -> dict:
+    tasks = [(path, os.path.join(output_dir, rel + ".bt1"), codec, encryptor, force)
+             for path, rel in collect(sources, manifest, base)]
+    tasks, rejected = _claim_targets(tasks, lambda task: task[1])
+    return _run(tasks, _pack_one, password, jobs, log, kdf, rejected)
+
+def unpack_tree(sources: list, output_dir: str, password: str = "test1", jobs: int = 1, manifest: str = None,
+                base: str = None, force: bool = False, log=print) -> dict:
+    tasks = [(path, os.path.join(output_dir, os.path.dirname(rel)), force)
+             for path, rel in collect(sources, manifest, base, suffix=".bt1")]
+    tasks, rejected = _claim_targets(tasks, _unpack_target)
+    return _run(tasks, _unpack_one, password, jobs, log, rejected=rejected)
+
+def verify_tree(sources: list, password: str = "test1", jobs: int = 1, manifest: str = None,
+                check_digest: bool = True, log=print) -> dict:
+    # Nothing is written, so auditing a store needs no scratch space.
+    tasks = [(path, check_digest) for path, _ in collect(sources, manifest, suffix=".bt1")]
+    return _run(tasks, _verify_one, password, jobs, log)
+
+def format_summary(summary: dict) -> str:
+    seconds = summary["seconds"] or 1e-9
+    return (f"{summary['done']} done, {summary['skipped']} skipped, {summary['failed']} failed "
+            f"in {summary['seconds']:.2f} s — {summary['done'] / seconds:.1f} files/s, "
+            f"{summary['bytes'] / (1 << 20) / seconds:.1f} MB/s")
@@ -0,0 +1,620 @@
+import os
+import sys
+import json
+import asyncio
+import time
+import zlib
+import random
+import platform
+import tempfile
+import tracemalloc
+import bt1module
+
+# ===== Reference engine =====
+# The dict-based mapping engine bt1module used before translation tables.
+# Kept here only so benchmarks can report before/after numbers.
+
+def dict_apply_mapping(data: bytes, mapping: dict) -> bytes:
+    return bytes([mapping[b] for b in data])
+
+def dict_create_mapping(seed) -> dict:
+    random.seed(seed)
+    original = list(range(256))
+    shuffled = original[:]
+    random.shuffle(shuffled)
+    return dict(zip(original, shuffled))
+
+# ===== Payloads =====
+
+SIZES = {"1K": 1 << 10, "64K": 64 << 10, "1M": 1 << 20, "16M": 16 << 20, "256M": 256 << 20, "1G": 1 << 30}
+DEFAULT_SIZES = ["1K", "64K", "1M", "16M"]
+KINDS = ["random", "text", "compressed"]
+WORDS = ("the quick brown fox jumps over lazy dog packet frame archive cipher "
+         "stream header offset member table index session key salt nonce").split()
+
+def make_text(size: int, seed: int = 0) -> bytes:
+    rng = random.Random(seed)
+    line = lambda: " ".join(rng.choice(WORDS) for _ in range(12)) + "\n"
+    parts, total = [], 0
+    while total < size:
+        parts.append(line().encode())
+        total += len(parts[-1])
+    return b"".join(parts)[:size]
+
+def make_payload(kind: str, size: int) -> bytes:
+    if kind == "random":
+        return os.urandom(size)
+    if kind == "text":
+        return make_text(size)
+    if kind == "compressed":
+        parts, total, seed = [], 0, 0
+        while total < size:
+            parts.append(zlib.compress(make_text(max(size, 1 << 16), seed), 9))
+            total += len(parts[-1])
+            seed += 1
+        return b"".join(parts)[:size]
+    raise ValueError(f"Unknown payload kind: {kind}")
+
+# ===== Stages =====
+# Each stage is timed on its own, fed with the output of the stage before
+# it, the same way bt1_pack_file and bt1_unpack_file chain them.
+
+def _timed(fn, repeat: int):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def _peak(fn) -> int:
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def _stages(data: bytes, workdir: str):
+    key = bt1module.derive_key("bench", b"\x00" * 16)
+    nonce = b"\x00" * 12
+    table = bt1module.compose_mappings(bt1module.create_mapping(1), bt1module.create_mapping(2))
+    src = os.path.join(workdir, "payload.bin")
+    with open(src, "wb") as f:
+        f.write(data)
+
+    compressed = zlib.compress(data)
+    mapped = bt1module.apply_mapping(compressed, table)
+    aes = bt1module.aes192_encrypt(mapped, key)
+    chacha = bt1module.chacha20_encrypt(aes, key, nonce)
+
+    return [
+        ("zlib_compress", len(data), lambda: zlib.compress(data)),
+        ("zlib_decompress", len(data), lambda: zlib.decompress(compressed)),
+        ("create_mapping", None, lambda: (bt1module.create_mapping.cache_clear(),
+                                          bt1module.compose_mappings(bt1module.create_mapping(1), bt1module.create_mapping(2)))),
+        ("apply_mapping", len(compressed), lambda: bt1module.apply_mapping(compressed, table)),
+        ("derive_key", None, lambda: bt1module.derive_key("bench", b"\x00" * 16)),
+        ("aes192_encrypt", len(mapped), lambda: bt1module.aes192_encrypt(mapped, key)),
+        ("aes192_decrypt", len(aes), lambda: bt1module.aes192_decrypt(aes, key)),
+        ("chacha20_encrypt", len(aes), lambda: bt1module.chacha20_encrypt(aes, key, nonce)),
+        ("chacha20_decrypt", len(chacha), lambda: bt1module.chacha20_decrypt(chacha, key, nonce)),
+        ("bt1_pack_file", len(data), lambda: bt1module.bt1_pack_file(src, os.path.join(workdir, "payload.bt1"), "bench")),
+        ("bt1_unpack_file", len(data), lambda: bt1module.bt1_unpack_file(os.path.join(workdir, "payload.bt1"), os.path.join(workdir, "out"), "bench")),
+    ]
+
+def _mb_per_s(size: int, seconds: float) -> float:
+    return size / (1 << 20) / seconds if seconds else float("inf")
+
+# ===== Startup =====
+# Wall time of fresh interpreters: importing bt1module, importing it and
+# encrypting one block (cipher imports plus the AES backend probe), and
+# `bt1module.py --help`. Reported as fixed-cost "startup" stages so
+# baselines catch import-time regressions.
+
+STARTUP_COMMANDS = {
+    "python": "pass",
+    "import": "import bt1module",
+    "cipher": "import bt1module; bt1module.aes192_encrypt(b'', bytes(32)); bt1module.chacha20_encrypt(b'', bytes(32), bytes(12))",
+}
+
+def bench_startup(repeat: int = 5) -> list:
+    import subprocess
+    here = os.path.dirname(os.path.abspath(__file__))
+    commands = {name: [sys.executable, "-c", code] for name, code in STARTUP_COMMANDS.items()}
+    commands["cli_help"] = [sys.executable, os.path.join(here, "bt1module.py"), "--help"]
+    results = []
+    for name, command in commands.items():
+        seconds, _ = _timed(lambda: subprocess.run(command, cwd=here, check=True, stdout=subprocess.DEVNULL), repeat)
+        results.append({"stage": f"startup_{name}", "kind": "startup", "size": "-", "seconds": seconds, "mb_s": None,
+                        "peak_bytes": None})
+    return results
+
+def import_profile(limit: int = 10) -> list:
+    # (cumulative µs, module) for the slowest top-level imports of bt1module.
+    import subprocess
+    here = os.path.dirname(os.path.abspath(__file__))
+    err = subprocess.run([sys.executable, "-X", "importtime", "-c", "import bt1module"], cwd=here, check=True,
+                         capture_output=True, text=True).stderr
+    rows = []
+    for line in err.splitlines():
+        # "import time: self | cumulative | name", indented by import depth.
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit() and parts[2].startswith("   ") and parts[2][3] != " ":
+            rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:limit]
+
+def run_suite(sizes=DEFAULT_SIZES, kinds=KINDS, repeat: int = 3, memory: bool = True, log=print,
+              startup: bool = True) -> dict:
+    results = []
+    for size_name in sizes:
+        for kind in kinds:
+            data = make_payload(kind, SIZES[size_name])
+            with tempfile.TemporaryDirectory() as workdir:
+                os.mkdir(os.path.join(workdir, "out"))
+                for stage, nbytes, fn in _stages(data, workdir):
+                    seconds, _ = _timed(fn, repeat)
+                    entry = {
+                        "stage": stage, "kind": kind, "size": size_name, "seconds": seconds,
+                        "mb_s": _mb_per_s(nbytes, seconds) if nbytes is not None else None,
+                        "peak_bytes": _peak(fn) if memory else None
+                    }
+                    results.append(entry)
+                    if log:
+                        log(_format(entry))
+            del data
+    if startup:
+        for entry in bench_startup(max(repeat, 5)):
+            results.append(entry)
+            if log:
+                log(_format(entry))
+    return {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results
+    }
+
+def _format(entry: dict) -> str:
+    rate = f"{entry['mb_s']:10.1f} MB/s" if entry["mb_s"] is not None else f"{entry['seconds'] * 1000:10.2f} ms  "
+    peak = f"{entry['peak_bytes'] / (1 << 20):9.1f} MiB peak" if entry.get("peak_bytes") is not None else ""
+    return f"{entry['stage']:<18} {entry['kind']:<10} {entry['size']:>5}  {rate}  {peak}"
+
+# ===== Baselines =====
+
+def save_baseline(report: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+def load_baseline(path: str) -> dict:
+    with open(path, "r") as f:
+        return json.load(f)
+
+def compare(baseline: dict, current: dict, threshold: float = 0.10) -> list:
+    # Flags throughput drops, slower fixed-cost stages and peak-memory growth
+    # beyond threshold (a fraction, 0.10 = 10%).
+    base = {(r["stage"], r["kind"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for now in current["results"]:
+        before = base.get((now["stage"], now["kind"], now["size"]))
+        if before is None:
+            continue
+        if now["mb_s"] is not None and before["mb_s"] and now["mb_s"] < before["mb_s"] * (1 - threshold):
+            regressions.append((now, "mb_s", before["mb_s"], now["mb_s"]))
+        elif now["mb_s"] is None and now["seconds"] > before["seconds"] * (1 + threshold):
+            regressions.append((now, "seconds", before["seconds"], now["seconds"]))
+        if now.get("peak_bytes") and before.get("peak_bytes") and now["peak_bytes"] > before["peak_bytes"] * (1 + threshold):
+            regressions.append((now, "peak_bytes", before["peak_bytes"], now["peak_bytes"]))
+    return regressions
+
+# ===== Mapping engine before/after =====
+
+def bench_mapping(size: int = 8 << 20):
+    data = os.urandom(size)
+    dict1, dict2 = dict_create_mapping(1), dict_create_mapping(2)
+    map1 = bt1module.create_mapping(1)
+    map2 = bt1module.create_mapping(2)
+
+    start = time.perf_counter()
+    before = dict_apply_mapping(dict_apply_mapping(data, dict1), dict2)
+    dict_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    after = bt1module.apply_mapping(data, bt1module.compose_mappings(map1, map2))
+    table_time = time.perf_counter() - start
+
+    if before != after:
+        raise AssertionError("Table engine output differs from the dict engine.")
+    return {"dict_mb_s": _mb_per_s(size, dict_time), "table_mb_s": _mb_per_s(size, table_time)}
+
+# ===== asyncio load =====
+# Packs `requests` payloads with `concurrency` in flight while a ticker
+# coroutine measures event-loop lag, once calling bt1_pack_file directly
+# from coroutines and once through bt1async.
+
+async def _load(pack, paths: list, concurrency: int):
+    lags, done = [], asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lags.append(time.perf_counter() - start - 0.005)
+
+    slots = asyncio.Semaphore(concurrency)
+    async def one(src, dst):
+        async with slots:
+            await pack(src, dst)
+
+    tick = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    await asyncio.gather(*(one(src, src + ".bt1") for src in paths))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await tick
+    return elapsed, max(lags, default=0.0)
+
+def bench_async_load(requests: int = 200, size: int = 64 << 10, concurrency: int = 16) -> dict:
+    import bt1async
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir, bt1module.KeySession("bench") as session:
+        paths = []
+        for i in range(requests):
+            paths.append(os.path.join(workdir, f"req{i}.bin"))
+            with open(paths[-1], "wb") as f:
+                f.write(make_payload("text", size))
+
+        async def blocking(src, dst):
+            bt1module.bt1_pack_file(src, dst, session=session)
+
+        runner = bt1async.BT1Async(max_concurrency=concurrency)
+        async def non_blocking(src, dst):
+            await runner.pack(src, dst, session=session)
+
+        for name, pack in (("blocking", blocking), ("async", non_blocking)):
+            elapsed, lag = asyncio.run(_load(pack, paths, concurrency))
+            results[name] = {"req_s": requests / elapsed, "mb_s": _mb_per_s(requests * size, elapsed),
+                             "max_loop_lag_ms": lag * 1000}
+        runner.close()
+    return results
+
+# ===== In-memory API =====
+# What a service holding data in memory pays: the temp-file round trip it
+# used before bt1_pack_bytes/bt1_unpack_bytes, and the bytes API itself.
+
+def _via_files(data: bytes, workdir: str) -> bytes:
+    src, packed, out = (os.path.join(workdir, name) for name in ("in.bin", "in.bt1", "out"))
+    os.makedirs(out, exist_ok=True)
+    with open(src, "wb") as f:
+        f.write(data)
+    bt1module.bt1_pack_file(src, packed, "bench")
+    with open(packed, "rb") as f:
+        archive = f.read()
+    with open(packed, "wb") as f:
+        f.write(archive)
+    bt1module.bt1_unpack_file(packed, out, "bench")
+    with open(os.path.join(out, "in.bin"), "rb") as f:
+        return f.read()
+
+def _via_bytes(data: bytes, workdir: str) -> bytes:
+    return bt1module.bt1_unpack_bytes(bt1module.bt1_pack_bytes(data, "bench"), "bench")
+
+def bench_bytes_api(size: int = 64 << 20, kind: str = "text") -> dict:
+    data = make_payload(kind, size)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, fn in (("temp_files", _via_files), ("bytes_api", _via_bytes)):
+            seconds, result = _timed(lambda: fn(data, workdir), 1)
+            if result != data:
+                raise AssertionError(f"{name} round trip changed the data.")
+            del result
+            results[name] = {"mb_s": _mb_per_s(size, seconds), "peak_bytes": _peak(lambda: fn(data, workdir))}
+    return results
+
+# ===== Dedup re-pack =====
+# A daily re-pack of a file where `changed` of the bytes were rewritten in
+# 64 KiB blocks: a full bt1_pack_file versus bt1_pack_dedup against the
+# previous day's archive.
+
+def bench_dedup(size: int = 256 << 20, changed: float = 0.02) -> dict:
+    data = bytearray(make_payload("text", size // 2) + make_payload("random", size - size // 2))
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as workdir:
+        src = os.path.join(workdir, "image.bin")
+        with open(src, "wb") as f:
+            f.write(data)
+        bt1module.bt1_pack_dedup(src, os.path.join(workdir, "day1.bt1"), "bench")
+        for _ in range(max(1, int(size * changed) // (64 << 10))):
+            offset = rng.randrange(0, size - (64 << 10))
+            data[offset:offset + (64 << 10)] = os.urandom(64 << 10)
+        with open(src, "wb") as f:
+            f.write(data)
+
+        full, _ = _timed(lambda: bt1module.bt1_pack_file(src, os.path.join(workdir, "full.bt1"), "bench"), 1)
+        repack, stats = _timed(lambda: bt1module.bt1_pack_dedup(src, os.path.join(workdir, "day2.bt1"), "bench",
+                                                                base=os.path.join(workdir, "day1.bt1")), 1)
+        return {"full_s": full, "dedup_s": repack, "full_bytes": os.path.getsize(os.path.join(workdir, "full.bt1")),
+                "dedup_bytes": os.path.getsize(os.path.join(workdir, "day2.bt1")), **stats}
+
+# ===== Encryptors =====
+# Pack and unpack throughput of the same payload under each registered
+# encryptor, through the in-memory API so file I/O does not hide the
+# difference. Random data is stored uncompressed by the auto codec, which
+# leaves the cipher stages as the whole cost.
+
+def bench_encryptors(size: int = 64 << 20, kind: str = "random") -> dict:
+    data = make_payload(kind, size)
+    results = {}
+    for name in bt1module.ENCRYPTORS:
+        pack_s, archive = _timed(lambda: bt1module.bt1_pack_bytes(data, "bench", encryptor=name), 3)
+        unpack_s, result = _timed(lambda: bt1module.bt1_unpack_bytes(archive, "bench"), 3)
+        if result != data:
+            raise AssertionError(f"{name} round trip changed the data.")
+        results[name] = {"pack_mb_s": _mb_per_s(size, pack_s), "unpack_mb_s": _mb_per_s(size, unpack_s)}
+    return results
+
+# ===== Daemon latency =====
+# Per-file latency of packing small files: a fresh `bt1module.py pack`
+# process per file (what pipelines did before), the bt1client.py shim
+# against a warm daemon, and a BT1Client kept open in this process.
+
+def bench_daemon(requests: int = 20, size: int = 4 << 10) -> dict:
+    import threading
+    import subprocess
+    import bt1daemon
+    from bt1client import BT1Client
+    here = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as workdir:
+        socket_path = os.path.join(workdir, "bt1.sock")
+        paths = []
+        for i in range(requests):
+            paths.append(os.path.join(workdir, f"in{i}.bin"))
+            with open(paths[-1], "wb") as f:
+                f.write(make_payload("text", size))
+        daemon = bt1daemon.BT1Daemon(socket_path, "bench", log=None)
+        threading.Thread(target=daemon.serve_forever, daemon=True).start()
+        try:
+            commands = {
+                "process": lambda src: subprocess.run([sys.executable, os.path.join(here, "bt1module.py"), "pack", src,
+                                                       src + ".bt1", "--password", "bench"], check=True,
+                                                      stdout=subprocess.DEVNULL),
+                "shim": lambda src: subprocess.run([sys.executable, os.path.join(here, "bt1client.py"), "--socket",
+                                                    socket_path, "--password", "bench", "pack", src, src + ".bt1"],
+                                                   check=True, stdout=subprocess.DEVNULL),
+            }
+            results = {}
+            for name, fn in commands.items():
+                start = time.perf_counter()
+                for src in paths:
+                    fn(src)
+                results[name] = (time.perf_counter() - start) * 1000 / requests
+            with BT1Client(socket_path, "bench") as client:
+                client.pack(paths[0], paths[0] + ".bt1")
+                start = time.perf_counter()
+                for src in paths:
+                    client.pack(src, src + ".bt1")
+                results["client"] = (time.perf_counter() - start) * 1000 / requests
+        finally:
+            daemon.shutdown()
+            daemon.server_close()
+    return results
+
+# ===== Catalog =====
+# Scan, unchanged rescan and 1%-touched rescan over `files` real archives,
+# then lookups in a catalog of `rows` synthetic entries created evenly over
+# 2010-2024.
+
+def bench_catalog(files: int = 2000, rows: int = 1_000_000) -> dict:
+    import bt1catalog
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        store = os.path.join(workdir, "store")
+        with bt1module.KeySession("bench") as session:
+            for i in range(files):
+                folder = os.path.join(store, f"d{i % 50:02d}")
+                os.makedirs(folder, exist_ok=True)
+                with open(os.path.join(folder, f"f{i:07d}.bt1"), "wb") as f:
+                    f.write(bt1module.bt1_pack_bytes(b"x" * 100, "bench", f"f{i:07d}.txt", session=session))
+        with bt1catalog.Catalog(os.path.join(workdir, "scan.db")) as catalog:
+            results["scan_s"] = catalog.scan([store])["seconds"]
+            results["rescan_s"] = catalog.scan([store])["seconds"]
+            for i in range(0, files, 100):
+                path = os.path.join(store, f"d{i % 50:02d}", f"f{i:07d}.bt1")
+                os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 10**9))
+            summary = catalog.scan([store])
+            results["touched_rescan_s"], results["touched"] = summary["seconds"], summary["updated"]
+
+        db_path = os.path.join(workdir, "big.db")
+        with bt1catalog.Catalog(db_path) as catalog:
+            pass
+        db = bt1catalog.sqlite3.connect(db_path)
+        with db:
+            db.executemany(f"INSERT INTO archives VALUES ({', '.join('?' * len(bt1catalog.COLUMNS))})", (
+                (f"/store/d{i % 1000:03d}/f{i:07d}.bt1", 0, 1000, "v2", f"f{i:07d}.txt", 900, 950,
+                 time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(1262304000 + i * (15 * 365 * 86400) // rows)),
+                 "M25-v1" if i % 4 else "C20P-v1", "zlib") for i in range(rows)))
+        db.close()
+        with bt1catalog.Catalog(db_path) as catalog:
+            queries = {
+                "exact_name": lambda: catalog.find(f"f{rows // 2:07d}.txt"),
+                "name_prefix": lambda: catalog.find(f"f{rows // 2 // 100:05d}*"),
+                "one_day": lambda: catalog.find(since="2018-06-15", until="2018-06-15"),
+                "encryptor_month": lambda: catalog.find(since="2018-06-01", until="2018-06-30", encryptor="C20P-v1"),
+            }
+            for name, fn in queries.items():
+                seconds, found = _timed(fn, 5)
+                results[name] = (seconds * 1000, len(found))
+    return results
+
+# ===== Multi-file pack =====
+# The PyQt GUI used to pack a selection by writing it into a temporary
+# ZIP (stored, so a full copy of the input) and packing that; it now
+# streams the files into one multi-member archive with bt1_pack_many.
+# Scratch bytes are what the old path wrote besides the output.
+
+def _pack_via_zip(paths: list, output: str):
+    import zipfile
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".zip") as tmpzip:
+        with zipfile.ZipFile(tmpzip.name, "w") as zf:
+            for path in paths:
+                zf.write(path, arcname=os.path.basename(path))
+    try:
+        bt1module.bt1_pack_file(tmpzip.name, output, "bench")
+        return os.path.getsize(tmpzip.name)
+    finally:
+        os.remove(tmpzip.name)
+
+def bench_multi_pack(files: int = 16, size: int = 256 << 20) -> dict:
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        paths = []
+        for i in range(files):
+            paths.append(os.path.join(workdir, f"file{i:02d}.bin"))
+            with open(paths[-1], "wb") as f:
+                f.write(make_payload(KINDS[i % len(KINDS)], size // files))
+        output = os.path.join(workdir, "out.bt1")
+        seconds, scratch = _timed(lambda: _pack_via_zip(paths, output), 1)
+        results["temp_zip"] = {"seconds": seconds, "scratch_bytes": scratch,
+                               "written_bytes": scratch + os.path.getsize(output)}
+        seconds, _ = _timed(lambda: bt1module.bt1_pack_many(paths, output, "bench"), 1)
+        results["streaming"] = {"seconds": seconds, "scratch_bytes": 0, "written_bytes": os.path.getsize(output)}
+    return results
+
+# ===== CLI usable =====
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(prog="bt1bench.py", description="Per-stage BT1 benchmarks.")
+    commands = parser.add_subparsers(dest="mode", required=True)
+
+    run_cmd = commands.add_parser("run", help="time every stage and optionally save or compare a baseline")
+    run_cmd.add_argument("--sizes", default=",".join(DEFAULT_SIZES), help=f"comma list of {', '.join(SIZES)}")
+    run_cmd.add_argument("--kinds", default=",".join(KINDS), help=f"comma list of {', '.join(KINDS)}")
+    run_cmd.add_argument("--repeat", type=int, default=3)
+    run_cmd.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory pass")
+    run_cmd.add_argument("--save", metavar="JSON")
+    run_cmd.add_argument("--compare", metavar="BASELINE_JSON")
+    run_cmd.add_argument("--threshold", type=float, default=0.10)
+    run_cmd.add_argument("--no-startup", action="store_true", help="skip the interpreter startup stages")
+
+    compare_cmd = commands.add_parser("compare", help="compare two saved results")
+    compare_cmd.add_argument("baseline")
+    compare_cmd.add_argument("current")
+    compare_cmd.add_argument("--threshold", type=float, default=0.10)
+
+    mapping_cmd = commands.add_parser("mapping", help="dict vs translation-table mapping engine")
+    mapping_cmd.add_argument("size", type=int, nargs="?", default=8 << 20)
+
+    load_cmd = commands.add_parser("async-load", help="many concurrent packs: blocking calls vs bt1async")
+    load_cmd.add_argument("--requests", type=int, default=200)
+    load_cmd.add_argument("--size", type=int, default=64 << 10)
+    load_cmd.add_argument("--concurrency", type=int, default=16)
+
+    bytes_cmd = commands.add_parser("bytes-api", help="pack+unpack round trip: temp files vs bt1_pack_bytes/bt1_unpack_bytes")
+    bytes_cmd.add_argument("--size", default="16M", choices=list(SIZES))
+    bytes_cmd.add_argument("--kind", default="text", choices=KINDS)
+
+    dedup_cmd = commands.add_parser("dedup", help="re-pack a slightly changed file: full pack vs dedup against yesterday")
+    dedup_cmd.add_argument("--size", default="256M", choices=list(SIZES))
+    dedup_cmd.add_argument("--changed", type=float, default=0.02, help="fraction of the file rewritten (default: 0.02)")
+
+    encryptors_cmd = commands.add_parser("encryptors", help="pack/unpack throughput of each encryptor profile")
+    encryptors_cmd.add_argument("--size", default="16M", choices=list(SIZES))
+    encryptors_cmd.add_argument("--kind", default="random", choices=KINDS)
+
+    daemon_cmd = commands.add_parser("daemon", help="small-file pack latency: one process per file vs bt1daemon")
+    daemon_cmd.add_argument("--requests", type=int, default=20)
+    daemon_cmd.add_argument("--size", type=int, default=4 << 10)
+
+    startup_cmd = commands.add_parser("import-time", help="startup cost: fresh interpreters and the slowest imports")
+    startup_cmd.add_argument("--repeat", type=int, default=5)
+
+    catalog_cmd = commands.add_parser("catalog", help="catalog scan/rescan time and lookups over many archives")
+    catalog_cmd.add_argument("--files", type=int, default=2000, help="real archives to scan (default: 2000)")
+    catalog_cmd.add_argument("--rows", type=int, default=1_000_000, help="synthetic catalog rows (default: 10^6)")
+
+    multi_cmd = commands.add_parser("multi-pack", help="pack a file selection: temp ZIP + bt1_pack_file vs bt1_pack_many")
+    multi_cmd.add_argument("--files", type=int, default=16)
+    multi_cmd.add_argument("--size", default="256M", choices=list(SIZES), help="total size of the selection")
+
+    args = parser.parse_args()
+    if args.mode == "multi-pack":
+        for name, result in bench_multi_pack(args.files, SIZES[args.size]).items():
+            print(f"{name:<10} {result['seconds']:8.2f} s  {result['written_bytes'] / (1 << 20):8.1f} MiB written  "
+                  f"{result['scratch_bytes'] / (1 << 20):8.1f} MiB scratch")
+        sys.exit(0)
+
+    if args.mode == "catalog":
+        result = bench_catalog(args.files, args.rows)
+        for label, seconds in ((f"scan {args.files} archives", result["scan_s"]),
+                               ("rescan, unchanged", result["rescan_s"]),
+                               (f"rescan, {result['touched']} touched", result["touched_rescan_s"])):
+            print(f"{label:<26} {seconds * 1000:8.2f} ms")
+        for name in ("exact_name", "name_prefix", "one_day", "encryptor_month"):
+            ms, found = result[name]
+            print(f"{'find ' + name:<26} {ms:8.2f} ms  ({found} of {args.rows} rows)")
+        sys.exit(0)
+
+    if args.mode == "import-time":
+        for entry in bench_startup(args.repeat):
+            print(_format(entry))
+        print("slowest imports under bt1module:")
+        for micros, name in import_profile():
+            print(f"  {micros / 1000:8.1f} ms  {name}")
+        sys.exit(0)
+
+    if args.mode == "daemon":
+        for name, ms in bench_daemon(args.requests, args.size).items():
+            print(f"{name:<8} {ms:8.1f} ms/file")
+        sys.exit(0)
+
+    if args.mode == "encryptors":
+        results = bench_encryptors(SIZES[args.size], args.kind)
+        for name, result in results.items():
+            speedup = result["pack_mb_s"] / results[bt1module.DEFAULT_ENCRYPTOR]["pack_mb_s"]
+            print(f"{name:<8} pack {result['pack_mb_s']:8.1f} MB/s  unpack {result['unpack_mb_s']:8.1f} MB/s  "
+                  f"({speedup:.1f}x pack vs {bt1module.DEFAULT_ENCRYPTOR})")
+        sys.exit(0)
+
+    if args.mode == "dedup":
+        result = bench_dedup(SIZES[args.size], args.changed)
+        print(f"full pack   {result['full_s']:8.2f} s  {result['full_bytes'] / (1 << 20):8.1f} MiB written")
+        print(f"dedup       {result['dedup_s']:8.2f} s  {result['dedup_bytes'] / (1 << 20):8.1f} MiB written  "
+              f"({result['stored']} of {result['chunks']} chunks stored)")
+        sys.exit(0)
+
+    if args.mode == "bytes-api":
+        for name, result in bench_bytes_api(SIZES[args.size], args.kind).items():
+            print(f"{name:<11} {result['mb_s']:8.1f} MB/s  {result['peak_bytes'] / (1 << 20):8.1f} MiB peak")
+        sys.exit(0)
+
+    if args.mode == "async-load":
+        for name, result in bench_async_load(args.requests, args.size, args.concurrency).items():
+            print(f"{name:<9} {result['req_s']:8.1f} req/s {result['mb_s']:8.1f} MB/s  "
+                  f"max loop lag {result['max_loop_lag_ms']:8.1f} ms")
+        sys.exit(0)
+
+    if args.mode == "mapping":
+        result = bench_mapping(args.size)
+        print(f"apply_mapping x2 (dict) : {result['dict_mb_s']:10.1f} MB/s")
+        print(f"apply_mapping (table)   : {result['table_mb_s']:10.1f} MB/s")
+        sys.exit(0)
+
+    if args.mode == "run":
+        current = run_suite(args.sizes.split(","), args.kinds.split(","), args.repeat, not args.no_memory,
+                            startup=not args.no_startup)
+        if args.save:
+            save_baseline(current, args.save)
+            print(f"[✔] Saved: {args.save}")
+        if not args.compare:
+            sys.exit(0)
+        baseline = load_baseline(args.compare)
+    else:
+        baseline, current = load_baseline(args.baseline), load_baseline(args.current)
+
+    regressions = compare(baseline, current, args.threshold)
+    for entry, field, before, now in regressions:
+        print(f"[✘] {entry['stage']} {entry['kind']} {entry['size']}: {field} {before:.4g} -> {now:.4g}")
+    if not regressions:
+        print(f"[✔] No regressions beyond {args.threshold:.0%}")
+    sys.exit(1 if regressions else 0)
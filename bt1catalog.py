@@ -0,0 +1,211 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import bt1module
+
+# ===== Metadata Catalog =====
+# A SQLite index of the archive headers under one or more directories, so
+# finding an archive by original filename, creation date or encryptor is an
+# index lookup instead of opening every .bt1. Rows come from bt1_inspect
+# (header only, no password). A rescan compares each file's mtime and size
+# with its row and only re-reads archives that changed; rows of archives
+# that disappeared from a scanned directory are dropped.
+#
+# compressed_size is the metadata value for v1 archives and the bytes after
+# the header otherwise. Multi-member archives have no filename: their member
+# names are in the encrypted member table.
+
+COLUMNS = ("path", "mtime_ns", "archive_size", "format", "filename", "original_size", "compressed_size",
+           "created", "encryptor", "codec")
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS archives (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    archive_size INTEGER NOT NULL,
+    format TEXT,
+    filename TEXT,
+    original_size INTEGER,
+    compressed_size INTEGER,
+    created TEXT,
+    encryptor TEXT,
+    codec TEXT
+);
+CREATE INDEX IF NOT EXISTS archives_filename ON archives (filename);
+CREATE INDEX IF NOT EXISTS archives_created ON archives (created);
+CREATE INDEX IF NOT EXISTS archives_encryptor ON archives (encryptor, created);
+"""
+
+def default_db_path() -> str:
+    return os.environ.get("BT1_CATALOG") or ".bt1catalog.db"
+
+def _walk(root: str):
+    # Yields (path, mtime_ns, size) for every .bt1 file under root.
+    stack = [root]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.name.endswith(".bt1") and entry.is_file():
+                    stat = entry.stat()
+                    yield entry.path, stat.st_mtime_ns, stat.st_size
+
+def _row(path: str, mtime_ns: int, size: int) -> tuple:
+    info = bt1module.bt1_inspect(path)
+    metadata = info["metadata"]
+    row = (path, mtime_ns, size, info["format"], metadata.get("filename"), metadata.get("original_size"),
+           metadata.get("compressed_size", info["archive_size"] - info["header_size"]), metadata.get("created"),
+           metadata.get("encryptor", bt1module.DEFAULT_ENCRYPTOR), metadata.get("codec", "zlib"))
+    # A damaged header must fail this file, not the executemany of its whole root.
+    if not all(value is None or isinstance(value, (str, int, float)) for value in row):
+        raise ValueError("Invalid BT1 metadata.")
+    return row
+
+def _prefix_range(root: str) -> tuple:
+    # Paths under root sort between root + "/" and root + "0" ("0" follows "/").
+    return root.rstrip(os.sep) + os.sep, root.rstrip(os.sep) + chr(ord(os.sep) + 1)
+
+class Catalog:
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or default_db_path()
+        self._db = sqlite3.connect(self.db_path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.executescript(SCHEMA)
+
+    def scan(self, roots: list, log=None) -> dict:
+        summary = {"added": 0, "updated": 0, "unchanged": 0, "removed": 0, "failed": 0, "errors": []}
+        start = time.perf_counter()
+        with self._db:
+            for root in roots:
+                root = os.path.abspath(root)
+                if not os.path.isdir(root):
+                    raise ValueError(f"Not a directory: {root}")
+                low, high = _prefix_range(root)
+                known = {path: (mtime_ns, size) for path, mtime_ns, size in self._db.execute(
+                    "SELECT path, mtime_ns, archive_size FROM archives WHERE path >= ? AND path < ?", (low, high))}
+                rows, stale = [], []
+                for path, mtime_ns, size in _walk(root):
+                    before = known.pop(path, None)
+                    if before == (mtime_ns, size):
+                        summary["unchanged"] += 1
+                        continue
+                    try:
+                        rows.append(_row(path, mtime_ns, size))
+                    except (OSError, ValueError) as e:
+                        # An indexed archive that no longer reads loses its
+                        # row, so find does not serve its old header.
+                        if before:
+                            stale.append(path)
+                        summary["failed"] += 1
+                        summary["errors"].append((path, f"{type(e).__name__}: {e}"))
+                        if log:
+                            log(f"[✘] {path}: {e}")
+                        continue
+                    summary["updated" if before else "added"] += 1
+                self._db.executemany(f"INSERT OR REPLACE INTO archives VALUES ({', '.join('?' * len(COLUMNS))})",
+                                     rows)
+                self._db.executemany("DELETE FROM archives WHERE path = ?", ((path,) for path in stale + list(known)))
+                summary["removed"] += len(known)
+        summary["seconds"] = time.perf_counter() - start
+        return summary
+
+    def find(self, name: str = None, since: str = None, until: str = None, encryptor: str = None,
+             under: str = None, limit: int = None) -> list:
+        # name is an exact filename or a glob pattern (*, ?, [...]); since and
+        # until are ISO dates or date-times, both inclusive.
+        where, params = [], []
+        if name is not None:
+            where.append("filename GLOB ?" if any(c in name for c in "*?[") else "filename = ?")
+            params.append(name)
+        if since:
+            where.append("created >= ?")
+            params.append(since)
+        if until:
+            where.append("created <= ?")
+            params.append(until + "T23:59:59" if len(until) == 10 else until)
+        if encryptor:
+            where.append("encryptor = ?")
+            params.append(encryptor)
+        if under:
+            where.append("path >= ? AND path < ?")
+            params += _prefix_range(os.path.abspath(under))
+        sql = f"SELECT {', '.join(COLUMNS)} FROM archives"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created, path"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(zip(COLUMNS, row)) for row in self._db.execute(sql, params)]
+
+    def stats(self) -> dict:
+        count, original, stored = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(original_size), 0), COALESCE(SUM(archive_size), 0) FROM archives").fetchone()
+        formats = dict(self._db.execute("SELECT format, COUNT(*) FROM archives GROUP BY format"))
+        encryptors = dict(self._db.execute("SELECT encryptor, COUNT(*) FROM archives GROUP BY encryptor"))
+        return {"archives": count, "original_bytes": original, "archive_bytes": stored, "formats": formats,
+                "encryptors": encryptors}
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ===== CLI usable =====
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(prog="bt1catalog.py", description="Index .bt1 archive headers for fast lookups.")
+    parser.add_argument("--db", help="catalog file (default: $BT1_CATALOG or .bt1catalog.db)")
+    commands = parser.add_subparsers(dest="mode", required=True)
+
+    scan_cmd = commands.add_parser("scan", help="scan <dir>... (only changed archives are re-read)")
+    scan_cmd.add_argument("roots", nargs="+")
+
+    find_cmd = commands.add_parser("find", help="find archives by filename, date or encryptor")
+    find_cmd.add_argument("name", nargs="?", help="original filename or glob pattern")
+    find_cmd.add_argument("--since", help="created on or after (YYYY-MM-DD[THH:MM:SS])")
+    find_cmd.add_argument("--until", help="created on or before (YYYY-MM-DD[THH:MM:SS])")
+    find_cmd.add_argument("--encryptor")
+    find_cmd.add_argument("--under", help="only archives below this directory")
+    find_cmd.add_argument("--limit", type=int)
+    find_cmd.add_argument("--json", action="store_true", help="one JSON object per archive")
+
+    commands.add_parser("stats", help="archive counts and sizes")
+    args = parser.parse_args()
+
+    with Catalog(args.db) as catalog:
+        if args.mode == "scan":
+            try:
+                summary = catalog.scan(args.roots, log=lambda line: print(line, file=sys.stderr))
+            except ValueError as e:
+                print(f"[✘] {e}", file=sys.stderr)
+                sys.exit(1)
+            print(f"[{'✘' if summary['failed'] else '✔'}] {summary['added']} added, {summary['updated']} updated, "
+                  f"{summary['unchanged']} unchanged, {summary['removed']} removed, {summary['failed']} failed "
+                  f"in {summary['seconds']:.2f} s")
+            sys.exit(1 if summary["failed"] else 0)
+
+        if args.mode == "stats":
+            print(json.dumps(catalog.stats(), indent=2))
+            sys.exit(0)
+
+        start = time.perf_counter()
+        rows = catalog.find(args.name, args.since, args.until, args.encryptor, args.under, args.limit)
+        for row in rows:
+            if args.json:
+                print(json.dumps(row))
+            else:
+                print(f"{row['path']}  {row['filename'] or '(multi)'}  {row['original_size']} bytes  "
+                      f"{row['created']}  {row['encryptor']}")
+        print(f"{len(rows)} archives in {(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+        sys.exit(0 if rows else 1)
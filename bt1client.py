@@ -0,0 +1,211 @@
+import os
+import sys
+import json
+import stat
+import socket
+import struct
+
+# ===== Daemon Client =====
+# Talks to bt1daemon.py over its Unix socket. This module imports nothing
+# but the standard library, so the CLI shim starts in a few ms and leaves
+# the crypto imports and key derivation to the warm daemon.
+#
+# Every message, both ways, is MESSAGE_HEADER [>I JSON length][>Q payload
+# length], the JSON, then the payload. Requests are {"op": ..., ...};
+# replies are {"ok": true, "result": ...} or {"ok": false, "error": str}.
+# Pack, unpack and verify take paths (resolved here, since the daemon has
+# its own working directory) or, without "input", the data itself as the
+# payload, in which case the pack/unpack reply's payload is the archive or
+# the original.
+#
+# Requests carry the password, so the client only connects to a socket
+# owned by its own user: on a shared path another user could create it
+# first. Without $XDG_RUNTIME_DIR the socket lives in a per-user 0700
+# directory under /tmp. A message whose JSON or payload exceeds the
+# receiver's limits is a protocol error (ValueError).
+
+MESSAGE_HEADER = struct.Struct(">IQ")
+MAX_MESSAGE = 1 << 20
+
+def fallback_socket_dir() -> str:
+    return f"/tmp/bt1-{os.getuid()}"
+
+def default_socket_path() -> str:
+    if os.environ.get("BT1_SOCKET"):
+        return os.environ["BT1_SOCKET"]
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "bt1.sock")
+    return os.path.join(fallback_socket_dir(), "bt1.sock")
+
+def check_socket(socket_path: str):
+    # Raises PermissionError unless socket_path is a socket owned by this user.
+    st = os.lstat(socket_path)
+    if not stat.S_ISSOCK(st.st_mode):
+        raise PermissionError(f"Not a socket: {socket_path}")
+    if st.st_uid != os.getuid():
+        raise PermissionError(f"Socket is owned by another user: {socket_path}")
+
+class DaemonError(Exception):
+    pass
+
+def _recv_exact(sock, size: int, into: bytearray = None):
+    buf = bytearray(size) if into is None else into
+    view = memoryview(buf)
+    pos = 0
+    while pos < size:
+        n = sock.recv_into(view[pos:], size - pos)
+        if not n:
+            raise ConnectionError("BT1 daemon connection closed.")
+        pos += n
+    return buf
+
+def send_message(sock, message: dict, payload=b''):
+    body = json.dumps(message).encode()
+    sock.sendall(MESSAGE_HEADER.pack(len(body), len(payload)) + body)
+    if len(payload):
+        sock.sendall(payload)
+
+def recv_message(sock, max_payload: int = None):
+    # Returns (message, payload), or (None, None) on a clean close.
+    raw = sock.recv(MESSAGE_HEADER.size, socket.MSG_WAITALL)
+    if not raw:
+        return None, None
+    if len(raw) != MESSAGE_HEADER.size:
+        raise ConnectionError("BT1 daemon connection closed.")
+    body_len, payload_len = MESSAGE_HEADER.unpack(raw)
+    if body_len > MAX_MESSAGE:
+        raise ValueError(f"BT1 message too large: {body_len} bytes")
+    if max_payload is not None and payload_len > max_payload:
+        raise ValueError(f"BT1 payload too large: {payload_len} bytes (limit {max_payload})")
+    message = json.loads(_recv_exact(sock, body_len))
+    return message, _recv_exact(sock, payload_len)
+
+class BT1Client:
+    # One connection, reused for every call; not for use from several
+    # threads at once (open one client per thread instead).
+    def __init__(self, socket_path: str = None, password: str = None, timeout: float = None):
+        self.socket_path = socket_path or default_socket_path()
+        self.password = password
+        check_socket(self.socket_path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(self.socket_path)
+        except OSError:
+            self._sock.close()
+            raise
+
+    def request(self, op: str, payload=b'', **fields):
+        message = {"op": op, **{k: v for k, v in fields.items() if v is not None}}
+        if self.password is not None:
+            message.setdefault("password", self.password)
+        try:
+            send_message(self._sock, message, payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The daemon refused the message (e.g. too large) and hung up;
+            # its reply may already be waiting.
+            reply, data = recv_message(self._sock)
+            if reply is None:
+                raise
+        else:
+            reply, data = recv_message(self._sock)
+        if reply is None:
+            raise ConnectionError("BT1 daemon connection closed.")
+        if not reply["ok"]:
+            raise DaemonError(reply["error"])
+        return reply["result"], data
+
+    def ping(self) -> dict:
+        return self.request("ping")[0]
+
+    def pack(self, input_path: str, output_path: str, password: str = None, codec: str = None,
+             encryptor: str = None, workers: int = None, kdf: str = None) -> dict:
+        # kdf is a string such as "scrypt:16384" (see bt1module.parse_kdf).
+        return self.request("pack", input=os.path.abspath(input_path), output=os.path.abspath(output_path),
+                            password=password, codec=codec, encryptor=encryptor, workers=workers, kdf=kdf)[0]
+
+    def unpack(self, input_path: str, output_folder: str, password: str = None, workers: int = None) -> dict:
+        return self.request("unpack", input=os.path.abspath(input_path), output=os.path.abspath(output_folder),
+                            password=password, workers=workers)[0]
+
+    def verify(self, input_path: str, password: str = None, quick: bool = False) -> dict:
+        return self.request("verify", input=os.path.abspath(input_path), password=password, quick=quick)[0]
+
+    def pack_bytes(self, data, filename: str = "data.bin", password: str = None, codec: str = None,
+                   encryptor: str = None, kdf: str = None) -> bytearray:
+        return self.request("pack", memoryview(data).cast("B"), filename=filename, password=password, codec=codec,
+                            encryptor=encryptor, kdf=kdf)[1]
+
+    def unpack_bytes(self, data, password: str = None) -> bytearray:
+        return self.request("unpack", memoryview(data).cast("B"), password=password)[1]
+
+    def verify_bytes(self, data, password: str = None, quick: bool = False) -> dict:
+        return self.request("verify", memoryview(data).cast("B"), password=password, quick=quick)[0]
+
+    def shutdown(self):
+        self.request("shutdown")
+
+    def close(self):
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ===== CLI shim =====
+# Same commands as bt1module.py pack/unpack/verify, served by the daemon.
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(prog="bt1client.py", description="Pack and unpack .bt1 archives through bt1daemon.")
+    parser.add_argument("--socket", help="daemon socket (default: $BT1_SOCKET or a per-user path)")
+    parser.add_argument("--password")
+    commands = parser.add_subparsers(dest="mode", required=True)
+
+    pack_cmd = commands.add_parser("pack", help="pack <input_file> <output_file.bt1>")
+    pack_cmd.add_argument("input_file")
+    pack_cmd.add_argument("output_file")
+    pack_cmd.add_argument("--codec")
+    pack_cmd.add_argument("--encryptor")
+    pack_cmd.add_argument("--kdf", default=os.environ.get("BT1_KDF"))
+
+    unpack_cmd = commands.add_parser("unpack", help="unpack <input.bt1> <output_folder>")
+    unpack_cmd.add_argument("input_file")
+    unpack_cmd.add_argument("output_folder")
+
+    verify_cmd = commands.add_parser("verify", help="verify <input.bt1>...")
+    verify_cmd.add_argument("input_files", nargs="+")
+    verify_cmd.add_argument("--quick", action="store_true", help="check authentication tags only, skip digests")
+
+    commands.add_parser("ping", help="check that the daemon is up")
+    commands.add_parser("shutdown", help="stop the daemon")
+    args = parser.parse_args()
+
+    try:
+        with BT1Client(args.socket, args.password) as client:
+            if args.mode == "pack":
+                client.pack(args.input_file, args.output_file, codec=args.codec, encryptor=args.encryptor, kdf=args.kdf)
+                print(f"[✔] Packed: {args.output_file}")
+            elif args.mode == "unpack":
+                client.unpack(args.input_file, args.output_folder)
+                print(f"[✔] Unpacked to: {args.output_folder}")
+            elif args.mode == "verify":
+                failed = 0
+                for path in args.input_files:
+                    try:
+                        result = client.verify(path, quick=args.quick)
+                        print(f"[✔] {path}: {result['frames']} frames, digest {result['digest']}")
+                    except DaemonError as e:
+                        failed += 1
+                        print(f"[✘] {path}: {e}", file=sys.stderr)
+                sys.exit(1 if failed else 0)
+            elif args.mode == "ping":
+                print(f"[✔] {json.dumps(client.ping())}")
+            else:
+                client.shutdown()
+                print("[✔] Daemon stopped")
+    except (OSError, DaemonError) as e:
+        print(f"[✘] {e}", file=sys.stderr)
+        sys.exit(1)
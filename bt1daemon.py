@@ -0,0 +1,231 @@
+import os
+import sys
+import stat
+import time
+import threading
+import contextlib
+import socketserver
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import bt1module
+from bt1client import default_socket_path, fallback_socket_dir, send_message, recv_message, BT1Client
+
+# ===== BT1 Daemon =====
+# A long-running process serving pack/unpack/verify requests on a Unix
+# socket (protocol in bt1client.py). It pays the interpreter start, the
+# crypto imports and the KDF once: requests run on a fixed thread pool, and
+# each password (and KDF, for packing) gets one KeySession, so packing only
+# runs HKDF per archive and unpacking archives packed through the daemon
+# reuses the master key.
+# The socket is created mode 0600, so only its owner can connect. Frame
+# crypto for requests with workers > 1 runs on one long-lived FramePool of
+# frame_workers processes, shared by all requests and started once.
+# Payloads above max_payload are refused before anything is allocated.
+
+MAX_SESSIONS = 16
+MAX_PAYLOAD = 1 << 30
+
+class BT1Daemon(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str = None, password: str = "test1", jobs: int = 4, log=print,
+                 frame_workers: int = None, max_payload: int = MAX_PAYLOAD):
+        self.socket_path = socket_path or default_socket_path()
+        self.password = password
+        self.log = log
+        self.max_payload = max_payload
+        self.pool = ThreadPoolExecutor(max(1, jobs), thread_name_prefix="bt1-daemon")
+        self.frame_workers = frame_workers or os.cpu_count() or 1
+        self._frame_pool = None
+        self.started = time.time()
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        _prepare_socket_dir(self.socket_path)
+        _remove_stale_socket(self.socket_path)
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(self.socket_path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+    @contextlib.contextmanager
+    def session(self, password: str, kdf: str = None):
+        # Yields the KeySession for password and kdf (parse_kdf form; None is
+        # DEFAULT_KDF). Sessions past MAX_SESSIONS are evicted least recently
+        # used first, but closed only once no request is still using them.
+        kdf = bt1module.parse_kdf(kdf) if kdf else bt1module.DEFAULT_KDF
+        key = (password, bt1module.kdf_text(kdf))
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is not None:
+                self._sessions.move_to_end(key)
+            else:
+                entry = self._sessions[key] = {"session": bt1module.KeySession(password, kdf=kdf), "users": 0,
+                                               "evicted": False}
+            entry["users"] += 1
+            while len(self._sessions) > MAX_SESSIONS:
+                old = self._sessions.popitem(last=False)[1]
+                old["evicted"] = True
+                if not old["users"]:
+                    old["session"].close()
+        try:
+            yield entry["session"]
+        finally:
+            with self._lock:
+                entry["users"] -= 1
+                if entry["evicted"] and not entry["users"]:
+                    entry["session"].close()
+
+    def frame_pool(self, workers: int):
+        # The shared FramePool for requests asking for workers > 1, else 1.
+        if workers <= 1 or self.frame_workers <= 1:
+            return 1
+        with self._lock:
+            if self._frame_pool is None:
+                self._frame_pool = bt1module.FramePool(self.frame_workers)
+            return self._frame_pool
+
+    def handle_request_message(self, message: dict, payload: bytearray):
+        # Returns (result, reply payload); runs on the pool.
+        op = message["op"]
+        if op == "ping":
+            return {"pid": os.getpid(), "uptime": time.time() - self.started}, b''
+        if op == "shutdown":
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            return {}, b''
+        password = message.get("password", self.password)
+        with self.session(password, message.get("kdf") if op == "pack" else None) as session:
+            return self._handle(op, message, payload, password, session)
+
+    def _handle(self, op: str, message: dict, payload: bytearray, password: str, session: bt1module.KeySession):
+        workers = self.frame_pool(message.get("workers", 1))
+        if op in ("pack", "unpack") and "input" in message and "output" not in message:
+            raise ValueError(f"{op} by path needs both input and output")
+        if op == "pack" and "input" in message:
+            bt1module.bt1_pack_file(message["input"], message["output"], password, workers=workers, session=session,
+                                    codec=message.get("codec", "auto"),
+                                    encryptor=message.get("encryptor", bt1module.DEFAULT_ENCRYPTOR))
+            return {"output": message["output"]}, b''
+        if op == "pack":
+            archive = bt1module.bt1_pack_bytes(payload, password, message.get("filename", "data.bin"),
+                                               session=session, codec=message.get("codec", "auto"),
+                                               encryptor=message.get("encryptor", bt1module.DEFAULT_ENCRYPTOR))
+            return {"size": len(archive)}, archive
+        if op == "unpack" and "input" in message:
+            bt1module.bt1_unpack_file(message["input"], message["output"], password, workers=workers, session=session)
+            return {"output": message["output"]}, b''
+        if op == "unpack":
+            original = bt1module.bt1_unpack_bytes(payload, password, session=session)
+            return {"size": len(original)}, original
+        if op == "verify" and "input" in message:
+            return bt1module.bt1_verify(message["input"], password, workers=workers, session=session,
+                                        check_digest=not message.get("quick")), b''
+        if op == "verify":
+            return bt1module.bt1_verify_bytes(payload, password, workers=workers, session=session,
+                                              check_digest=not message.get("quick")), b''
+        raise ValueError(f"Unknown request: {op}")
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=True)
+        if self._frame_pool is not None:
+            self._frame_pool.close()
+        with self._lock:
+            for entry in self._sessions.values():
+                entry["session"].close()
+            self._sessions.clear()
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+
+class _Handler(socketserver.BaseRequestHandler):
+    # Requests on one connection are answered in order; concurrency comes
+    # from clients opening several connections.
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                message, payload = recv_message(self.request, server.max_payload)
+            except OSError:
+                return
+            except (ValueError, MemoryError) as e:
+                # The stream is out of step after a refused message: reply, then hang up.
+                with contextlib.suppress(OSError):
+                    send_message(self.request, {"ok": False, "error": f"{type(e).__name__}: {e}"})
+                return
+            if message is None:
+                return
+            start = time.perf_counter()
+            try:
+                result, data = server.pool.submit(server.handle_request_message, message, payload).result()
+                reply = {"ok": True, "result": result}
+            except Exception as e:
+                result, data = None, b''
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}".rstrip(": ")}
+            del payload
+            try:
+                send_message(self.request, reply, data)
+            except OSError:
+                return
+            if server.log:
+                status = "✔" if reply["ok"] else "✘"
+                server.log(f"[{status}] {message.get('op')} {message.get('input', '<data>')} "
+                           f"{(time.perf_counter() - start) * 1000:.1f} ms")
+
+def _prepare_socket_dir(socket_path: str):
+    # The /tmp fallback directory is created 0700 and must be ours alone.
+    directory = os.path.dirname(socket_path)
+    if directory != fallback_socket_dir():
+        return
+    with contextlib.suppress(FileExistsError):
+        os.mkdir(directory, 0o700)
+    st = os.lstat(directory)
+    if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.getuid() or st.st_mode & 0o077:
+        raise ValueError(f"{directory} must be a directory owned by you with mode 0700")
+
+def _remove_stale_socket(socket_path: str):
+    # A socket file left by a daemon that died is removed; a live one is not,
+    # and neither is anything that is not a socket of ours.
+    try:
+        st = os.lstat(socket_path)
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(st.st_mode):
+        raise ValueError(f"Not a socket: {socket_path}")
+    if st.st_uid != os.getuid():
+        raise ValueError(f"Socket is owned by another user: {socket_path}")
+    try:
+        with BT1Client(socket_path, timeout=1.0) as client:
+            client.ping()
+    except OSError:
+        os.remove(socket_path)
+        return
+    raise ValueError(f"A BT1 daemon is already listening on {socket_path}")
+
+def serve(socket_path: str = None, password: str = "test1", jobs: int = 4, log=print, frame_workers: int = None,
+          max_payload: int = MAX_PAYLOAD):
+    with BT1Daemon(socket_path, password, jobs, log, frame_workers, max_payload) as daemon:
+        if log:
+            log(f"[✔] Listening on {daemon.socket_path} ({jobs} workers)")
+        daemon.serve_forever()
+
+# ===== CLI usable =====
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(prog="bt1daemon.py", description="Serve BT1 pack/unpack/verify on a Unix socket.")
+    parser.add_argument("--socket", help="socket path (default: $BT1_SOCKET or a per-user path)")
+    parser.add_argument("--password", default="test1", help="password for requests that do not send one")
+    parser.add_argument("--jobs", "-j", type=int, default=4, help="requests handled at once (default: 4)")
+    parser.add_argument("--frame-workers", type=int, help="processes shared by requests with workers > 1 "
+                                                           "(default: CPU count)")
+    parser.add_argument("--max-payload-mb", type=int, default=MAX_PAYLOAD >> 20,
+                        help=f"largest request payload accepted (default: {MAX_PAYLOAD >> 20})")
+    parser.add_argument("--quiet", action="store_true", help="do not log requests")
+    args = parser.parse_args()
+    try:
+        serve(args.socket, args.password, args.jobs, None if args.quiet else print, args.frame_workers,
+              args.max_payload_mb << 20)
+    except ValueError as e:
+        print(f"[✘] {e}", file=sys.stderr)
+        sys.exit(1)
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,92 @@
+import threading
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+import bt1module
+
+# ===== Background Jobs =====
+# Runs pack/unpack calls off the UI thread with a concurrency limit. Jobs
+# only change their own attributes; front ends poll jobs() from a timer
+# (QTimer for Qt, after() for Tk) and redraw from what they find.
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+class Job:
+    def __init__(self, job_id: int, kind: str, label: str):
+        self.id = job_id
+        self.kind = kind
+        self.label = label
+        self.status = QUEUED
+        self.percent = 0
+        self.text = ""
+        self.error = None
+        self.result = None
+        self._cancel = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED, CANCELLED)
+
+    def cancel(self):
+        self._cancel.set()
+        if self.status == QUEUED:
+            self.status = CANCELLED
+
+    def progress(self, event: dict):
+        if self._cancel.is_set():
+            raise bt1module.Cancelled()
+        percent = bt1module.progress_percent(event)
+        if percent is not None:
+            self.percent = percent
+        if event["event"] != "end":
+            self.text = bt1module.progress_text(event)
+
+    def describe(self) -> str:
+        detail = self.error if self.status == FAILED else self.text
+        return f"#{self.id} {self.kind} {self.label} — {self.status} {self.percent}% {detail or ''}".rstrip()
+
+class JobQueue:
+    def __init__(self, max_workers: int = 2):
+        self._pool = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="bt1-job")
+        self._ids = itertools.count(1)
+        self._jobs = []
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn, *args, label: str = "", **kwargs) -> Job:
+        # fn is called as fn(*args, progress=job.progress, **kwargs).
+        job = Job(next(self._ids), kind, label)
+        with self._lock:
+            self._jobs.append(job)
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn, args, kwargs):
+        if job.status == CANCELLED:
+            return
+        job.status = RUNNING
+        try:
+            job.result = fn(*args, progress=job.progress, **kwargs)
+            job.percent = 100
+            job.status = DONE
+        except bt1module.Cancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.status = FAILED
+
+    def jobs(self) -> list:
+        with self._lock:
+            return list(self._jobs)
+
+    def cancel(self, job_id: int):
+        for job in self.jobs():
+            if job.id == job_id:
+                job.cancel()
+
+    def clear_finished(self):
+        with self._lock:
+            self._jobs = [job for job in self._jobs if not job.finished]
+
+    def shutdown(self, wait: bool = False):
+        for job in self.jobs():
+            job.cancel()
+        self._pool.shutdown(wait=wait)
@@ -1,146 +1,1768 @@
 import os
 import time
+import io
 import json
 import zlib
+import bz2
+import lzma
 import struct
 import random
 import hashlib
-from Crypto.Cipher import AES
-from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
+import math
+import mmap
+import contextlib
+import itertools
+import hmac
+import threading
+from collections import deque, OrderedDict, Counter
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
 
 # ===== M25 Encrypt API =====
 
-def create_mapping(seed):
-    random.seed(seed)
-    original = list(range(256))
-    shuffled = original[:]
-    random.shuffle(shuffled)
-    return dict(zip(original, shuffled))
+# Mappings are 256-byte translation tables: table[b] is the substitute for
+# byte b, so apply_mapping runs at C speed through bytes.translate.
+# Each table is shuffled by its own random.Random(seed), which gives the
+# same table as the global random.seed(seed) + random.shuffle the format
+# was defined with, without touching the global generator, so concurrent
+# packs cannot reseed each other. Tables are immutable and cached per seed;
+# new seeds come from the OS generator.
 
-def inverse_mapping(mapping):
-    return {v: k for k, v in mapping.items()}
+MAPPING_CACHE_SIZE = 256
+_seed_source = random.SystemRandom()
 
-def apply_mapping(data: bytes, mapping: dict) -> bytes:
-    return bytes([mapping[b] for b in data])
+def new_seed() -> int:
+    return _seed_source.randint(1, 2**31 - 1)
 
-def derive_key(password: str, salt: bytes, iterations=100_000):
-    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations, dklen=32)
+@lru_cache(maxsize=MAPPING_CACHE_SIZE)
+def create_mapping(seed) -> bytes:
+    shuffled = list(range(256))
+    random.Random(seed).shuffle(shuffled)
+    return bytes(shuffled)
 
-def aes192_encrypt(data: bytes, key: bytes) -> bytes:
-    cipher = AES.new(key[:24], AES.MODE_ECB)
-    pad_len = 16 - len(data) % 16
-    data += bytes([pad_len] * pad_len)
-    return cipher.encrypt(data)
+@lru_cache(maxsize=MAPPING_CACHE_SIZE)
+def mapping_tables(seed1, seed2) -> tuple:
+    # (forward, inverse) of the merged table for an archive's two seeds.
+    table = compose_mappings(create_mapping(seed1), create_mapping(seed2))
+    return table, inverse_mapping(table)
 
-def aes192_decrypt(data: bytes, key: bytes) -> bytes:
-    cipher = AES.new(key[:24], AES.MODE_ECB)
-    decrypted = cipher.decrypt(data)
-    pad_len = decrypted[-1]
-    return decrypted[:-pad_len]
+def inverse_mapping(mapping: bytes) -> bytes:
+    inverse = bytearray(256)
+    for i, b in enumerate(mapping):
+        inverse[b] = i
+    return bytes(inverse)
 
-def chacha20_encrypt(data: bytes, key: bytes, nonce: bytes) -> bytes:
-    chacha = ChaCha20Poly1305(key)
-    return chacha.encrypt(nonce, data, None)
+def compose_mappings(first: bytes, second: bytes) -> bytes:
+    # Applying the result equals applying first, then second.
+    return first.translate(second)
 
-def chacha20_decrypt(data: bytes, key: bytes, nonce: bytes) -> bytes:
-    chacha = ChaCha20Poly1305(key)
-    return chacha.decrypt(nonce, data, None)
+def apply_mapping(data: bytes, mapping: bytes) -> bytes:
+    return data.translate(mapping)
 
-def m25_encrypt(data: bytes, password: str) -> bytes:
+# ===== Key Derivation =====
+# KDF parameters are a dict, stored as metadata["kdf"] in every new archive:
+#   {"name": "pbkdf2-sha256", "iterations": int}
+#   {"name": "scrypt", "n": int (power of 2), "r": int, "p": int}
+# Archives without one were packed with DEFAULT_KDF. Parameters read from a
+# header are checked before use, so an archive cannot make unpack run more
+# than KDF_MAX_ITERATIONS of PBKDF2, or more than KDF_MAX_MEMORY and
+# KDF_MAX_PARALLELISM lanes of scrypt. On the command line they are written
+# "pbkdf2:<iterations>" or "scrypt:<n>[:<r>:<p>]" (see parse_kdf).
+
+DEFAULT_KDF = {"name": "pbkdf2-sha256", "iterations": 100_000}
+KDF_MAX_ITERATIONS = 10_000_000
+KDF_MAX_MEMORY = 1 << 30
+KDF_MAX_PARALLELISM = 16
+
+def _scrypt_memory(n: int, r: int, p: int) -> int:
+    # What OpenSSL allocates: 128 * r * p for B, 128 * r * (n + 2) for V.
+    return 128 * r * (n + p + 2)
+
+def check_kdf(kdf: dict) -> dict:
+    name = kdf.get("name")
+    if name == "pbkdf2-sha256":
+        if not isinstance(kdf.get("iterations"), int) or kdf["iterations"] < 1:
+            raise ValueError("Invalid PBKDF2 iterations.")
+        if kdf["iterations"] > KDF_MAX_ITERATIONS:
+            raise ValueError("PBKDF2 iterations exceed KDF_MAX_ITERATIONS.")
+    elif name == "scrypt":
+        n, r, p = kdf.get("n"), kdf.get("r"), kdf.get("p")
+        if not all(isinstance(v, int) and v >= 1 for v in (n, r, p)) or n < 2 or n & (n - 1):
+            raise ValueError("Invalid scrypt parameters.")
+        if _scrypt_memory(n, r, p) > KDF_MAX_MEMORY:
+            raise ValueError("scrypt parameters need more memory than KDF_MAX_MEMORY.")
+        if p > KDF_MAX_PARALLELISM:
+            raise ValueError("scrypt parallelism exceeds KDF_MAX_PARALLELISM.")
+    else:
+        raise ValueError(f"Unknown KDF: {name}")
+    return kdf
+
+def parse_kdf(text: str) -> dict:
+    name, _, params = text.partition(":")
+    try:
+        values = [int(v) for v in params.split(":")] if params else []
+    except ValueError:
+        raise ValueError(f"Invalid KDF: {text}") from None
+    if name in ("pbkdf2", "pbkdf2-sha256") and len(values) <= 1:
+        return check_kdf({"name": "pbkdf2-sha256", "iterations": values[0] if values else 100_000})
+    if name == "scrypt" and len(values) in (0, 1, 3):
+        n, r, p = values if len(values) == 3 else (values[0] if values else 1 << 14, 8, 1)
+        return check_kdf({"name": "scrypt", "n": n, "r": r, "p": p})
+    raise ValueError(f"Invalid KDF: {text}")
+
+def kdf_text(kdf: dict) -> str:
+    if kdf["name"] == "scrypt":
+        return f"scrypt:{kdf['n']}:{kdf['r']}:{kdf['p']}"
+    return f"pbkdf2:{kdf['iterations']}"
+
+def derive_key(password: str, salt: bytes, iterations=100_000, kdf: dict = None):
+    if kdf is None:
+        return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, iterations, dklen=32)
+    check_kdf(kdf)
+    if kdf["name"] == "scrypt":
+        return hashlib.scrypt(password.encode(), salt=salt, n=kdf["n"], r=kdf["r"], p=kdf["p"],
+                              maxmem=_scrypt_memory(kdf["n"], kdf["r"], kdf["p"]) + (1 << 20), dklen=32)
+    return hashlib.pbkdf2_hmac('sha256', password.encode(), salt, kdf["iterations"], dklen=32)
+
+def _time_kdf(kdf: dict) -> float:
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        derive_key("calibrate", bytes(16), kdf=kdf)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def calibrate_kdf(name: str = "pbkdf2-sha256", target: float = 0.5) -> tuple:
+    # Returns (kdf, seconds) measured on this host. PBKDF2 scales linearly,
+    # so its iterations are sized to target (at most KDF_MAX_ITERATIONS); scrypt keeps r=8, p=1 and takes
+    # the largest power-of-2 n (at least 2^10) that stays under target.
+    if name in ("pbkdf2", "pbkdf2-sha256"):
+        probe = {"name": "pbkdf2-sha256", "iterations": 20_000}
+        per_iteration = _time_kdf(probe) / probe["iterations"]
+        iterations = min(KDF_MAX_ITERATIONS, max(1000, int(target / per_iteration) // 1000 * 1000))
+        kdf = {"name": "pbkdf2-sha256", "iterations": iterations}
+        return kdf, _time_kdf(kdf)
+    if name != "scrypt":
+        raise ValueError(f"Unknown KDF: {name}")
+    kdf = {"name": "scrypt", "n": 1 << 10, "r": 8, "p": 1}
+    seconds = _time_kdf(kdf)
+    while _scrypt_memory(kdf["n"] * 2, 8, 1) <= KDF_MAX_MEMORY and seconds * 1.5 <= target:
+        bigger = dict(kdf, n=kdf["n"] * 2)
+        bigger_seconds = _time_kdf(bigger)
+        if bigger_seconds > target:
+            break
+        kdf, seconds = bigger, bigger_seconds
+    return kdf, seconds
+
+def hkdf_sha256(key: bytes, salt: bytes, info: bytes, length: int = 32) -> bytes:
+    # RFC 5869 extract-and-expand.
+    prk = hmac.new(salt, key, 'sha256').digest()
+    okm, block = b'', b''
+    for counter in range(1, -(-length // 32) + 1):
+        block = hmac.new(prk, block + info + bytes([counter]), 'sha256').digest()
+        okm += block
+    return okm[:length]
+
+# ===== Crypto Backends =====
+# Cipher libraries are imported on first use, so runs that never encrypt
+# (inspect, --help) do not load them. AES-192-ECB comes from pycryptodome
+# or cryptography: BT1_AES_BACKEND or set_aes_backend() names one, and
+# "auto" (the default) times every installed backend on first use and
+# keeps the fastest. ChaCha20-Poly1305 always comes from cryptography.
+#
+# A backend loader returns ecb(key, encrypt, src, dst), which writes
+# len(src) bytes (whole blocks) to the start of dst; dst must have 15
+# spare bytes past that, which cryptography's update_into requires.
+
+def _load_pycryptodome():
+    from Crypto.Cipher import AES
+    def ecb(key: bytes, encrypt: bool, src, dst: memoryview):
+        cipher = AES.new(key, AES.MODE_ECB)
+        (cipher.encrypt if encrypt else cipher.decrypt)(src, output=dst[:len(src)])
+    return ecb
+
+def _load_cryptography():
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+    def ecb(key: bytes, encrypt: bool, src, dst: memoryview):
+        cipher = Cipher(algorithms.AES(key), modes.ECB())
+        context = cipher.encryptor() if encrypt else cipher.decryptor()
+        context.update_into(src, dst)
+        context.finalize()
+    return ecb
+
+AES_BACKENDS = {"pycryptodome": _load_pycryptodome, "cryptography": _load_cryptography}
+AES_PROBE_SIZE = 64 << 10
+_aes = {"name": os.environ.get("BT1_AES_BACKEND", "auto"), "ecb": None}
+_aes_lock = threading.Lock()
+
+def set_aes_backend(name: str = "auto"):
+    if name != "auto" and name not in AES_BACKENDS:
+        raise ValueError(f"Unknown AES backend: {name}")
+    with _aes_lock:
+        _aes.update(name=name, ecb=None)
+
+def _probe_aes(ecb) -> float:
+    key, src, dst = bytes(24), bytes(AES_PROBE_SIZE), memoryview(bytearray(AES_PROBE_SIZE + 16))
+    best = None
+    for _ in range(3):
+        start = time.perf_counter()
+        ecb(key, True, src, dst)
+        ecb(key, False, src, dst)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+# The "auto" winner is cached in the user cache dir, so the probe (and the
+# import of the losing library) runs once per install, not once per process.
+# The key is the Python version plus each library's location and install
+# stamp; importlib.metadata would cost more than the probe it saves.
+
+def _aes_cache_path() -> str:
+    root = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(root, "bt1", "aes-backend.json")
+
+def _aes_cache_key() -> str:
+    import sys
+    import importlib.util
+    parts = [sys.version.split()[0]]
+    for module in ("Crypto", "cryptography"):
+        spec = importlib.util.find_spec(module)
+        if spec is not None and spec.origin:
+            stat = os.stat(spec.origin)
+            parts.append(f"{module}={spec.origin}:{stat.st_mtime_ns}:{stat.st_size}")
+    return ";".join(parts)
+
+def _read_aes_cache(key: str):
+    try:
+        with open(_aes_cache_path(), "r") as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if isinstance(cached, dict) and cached.get("key") == key and cached.get("name") in AES_BACKENDS:
+        return cached["name"]
+    return None
+
+def _write_aes_cache(key: str, name: str):
+    path = _aes_cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(f"{path}.{os.getpid()}.part", "w") as f:
+            json.dump({"key": key, "name": name}, f)
+        os.replace(f"{path}.{os.getpid()}.part", path)
+    except OSError:
+        pass
+
+def _pick_aes_backend() -> str:
+    key = _aes_cache_key()
+    name = _read_aes_cache(key)
+    if name is not None:
+        return name
+    timed = {}
+    for candidate, load in AES_BACKENDS.items():
+        try:
+            timed[candidate] = _probe_aes(load())
+        except ImportError:
+            pass
+    if not timed:
+        raise ImportError("No AES backend installed (pycryptodome or cryptography).")
+    name = min(timed, key=timed.get)
+    _write_aes_cache(key, name)
+    return name
+
+def _aes_ecb():
+    if _aes["ecb"] is not None:
+        return _aes["ecb"]
+    with _aes_lock:
+        if _aes["ecb"] is None:
+            name = _pick_aes_backend() if _aes["name"] == "auto" else _aes["name"]
+            if name not in AES_BACKENDS:
+                raise ValueError(f"Unknown AES backend: {name}")
+            _aes.update(name=name, ecb=AES_BACKENDS[name]())
+    return _aes["ecb"]
+
+def aes_backend() -> str:
+    # The backend in use, running the "auto" probe if it has not run yet.
+    _aes_ecb()
+    return _aes["name"]
+
+@lru_cache(maxsize=None)
+def _chacha20poly1305():
+    from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
+    return ChaCha20Poly1305
+
+def aes192_encrypt(data: bytes, key: bytes) -> bytearray:
+    # ECB blocks are independent: the full blocks are encrypted straight into
+    # the output and only the padded last block is built separately, so the
+    # input is never copied to append the padding. The last block goes into
+    # the spare tail first, then the tail is trimmed.
+    ecb = _aes_ecb()
+    view = memoryview(data)
+    full = len(view) - len(view) % 16
+    pad_len = 16 - len(view) % 16
+    out = bytearray(full + 32)
+    ecb(key[:24], True, bytes(view[full:]) + bytes([pad_len] * pad_len), memoryview(out)[full:])
+    if full:
+        ecb(key[:24], True, view[:full], memoryview(out))
+    del out[full + 16:]
+    return out
+
+def aes192_decrypt(data: bytes, key: bytes) -> bytearray:
+    out = bytearray(len(data) + 16)
+    _aes_ecb()(key[:24], False, data, memoryview(out))
+    del out[len(data) - out[len(data) - 1]:]
+    return out
+
+def chacha20_encrypt(data: bytes, key: bytes, nonce: bytes, aad: bytes = None) -> bytes:
+    chacha = _chacha20poly1305()(key)
+    return chacha.encrypt(nonce, data, aad)
+
+def chacha20_decrypt(data: bytes, key: bytes, nonce: bytes, aad: bytes = None) -> bytes:
+    chacha = _chacha20poly1305()(key)
+    return chacha.decrypt(nonce, data, aad)
+
+def m25_encrypt(data: bytes, password: str, kdf: dict = None) -> bytes:
+    # The blob has no room for KDF parameters; callers record kdf themselves.
     salt = os.urandom(16)
     nonce = os.urandom(12)
-    rand1 = random.randint(1, 2**31 - 1)
-    rand2 = random.randint(1, 2**31 - 1)
-
-    map1 = create_mapping(rand1)
-    map2 = create_mapping(rand2)
+    rand1 = new_seed()
+    rand2 = new_seed()
 
-    stage0 = apply_mapping(data, map1)
-    stage1 = apply_mapping(stage0, map2)
+    table = mapping_tables(rand1, rand2)[0]
+    stage1 = apply_mapping(data, table)
 
-    key = derive_key(password, salt)
+    key = derive_key(password, salt, kdf=kdf)
     stage2 = aes192_encrypt(stage1, key)
     stage3 = chacha20_encrypt(stage2, key, nonce)
 
     return rand1.to_bytes(4, 'big') + rand2.to_bytes(4, 'big') + salt + nonce + stage3
 
-def m25_decrypt(blob: bytes, password: str) -> bytes:
+def m25_decrypt(blob: bytes, password: str, kdf: dict = None) -> bytes:
     rand1 = int.from_bytes(blob[0:4], 'big')
     rand2 = int.from_bytes(blob[4:8], 'big')
     salt = blob[8:24]
     nonce = blob[24:36]
     encrypted = blob[36:]
 
-    key = derive_key(password, salt)
+    key = derive_key(password, salt, kdf=kdf)
     stage2 = chacha20_decrypt(encrypted, key, nonce)
     stage1 = aes192_decrypt(stage2, key)
 
-    map2 = create_mapping(rand2)
-    map1 = create_mapping(rand1)
-    unmap2 = inverse_mapping(map2)
-    unmap1 = inverse_mapping(map1)
+    untable = mapping_tables(rand1, rand2)[1]
+    return apply_mapping(stage1, untable)
+
+# ===== Key Sessions =====
+# A KeySession runs the KDF once per session salt and derives each archive's
+# key from that master key with HKDF and the archive's own salt. Archives it
+# packs record its kdf; master keys for other KDF parameters (unpacking
+# archives packed elsewhere) are cached separately. Master keys live in a
+# bounded LRU and are zeroed on eviction and on close().
+
+FILE_KEY_INFO = b"BT1 file key"
+
+class KeySession:
+    def __init__(self, password: str, salt: bytes = None, max_keys: int = 64, kdf: dict = None):
+        self.salt = salt or os.urandom(16)
+        self.kdf = check_kdf(dict(kdf or DEFAULT_KDF))
+        self.max_keys = max_keys
+        self._password = password
+        self._masters = OrderedDict()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def master_key(self, salt: bytes = None, kdf: dict = None) -> bytes:
+        # Returns a copy taken under the lock: the cached bytearray is wiped
+        # when evicted or closed, possibly while another thread still uses it.
+        salt = salt or self.salt
+        kdf = kdf or self.kdf
+        cache_key = (salt, kdf_text(kdf))
+        with self._lock:
+            if self._closed:
+                raise ValueError("Key session is closed.")
+            master = self._masters.get(cache_key)
+            if master is not None:
+                self._masters.move_to_end(cache_key)
+                return bytes(master)
+
+        master = bytearray(derive_key(self._password, salt, kdf=kdf))
+        with self._lock:
+            if self._closed:
+                _wipe(master)
+                raise ValueError("Key session is closed.")
+            if cache_key in self._masters:
+                # Derived concurrently by another thread; keep its copy.
+                _wipe(master)
+                master = self._masters[cache_key]
+                self._masters.move_to_end(cache_key)
+            else:
+                self._masters[cache_key] = master
+            key = bytes(master)
+            while len(self._masters) > self.max_keys:
+                _wipe(self._masters.popitem(last=False)[1])
+        return key
+
+    def file_key(self, file_salt: bytes, salt: bytes = None, kdf: dict = None) -> bytes:
+        return hkdf_sha256(self.master_key(salt, kdf), file_salt, FILE_KEY_INFO)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            for master in self._masters.values():
+                _wipe(master)
+            self._masters.clear()
+            self._password = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _wipe(buf: bytearray):
+    buf[:] = bytes(len(buf))
+
+# ===== Instrumentation =====
+# Pack/unpack functions take progress=, a callable that receives one dict
+# per event (raising Cancelled from it aborts the call cleanly):
+#   {"event": "start" | "progress" | "end", "stage": str,
+#    "bytes": int, "total": int or None, "elapsed": float}
+# "pack"/"unpack"/"extract" wrap a whole call and "derive_key" covers key
+# setup. "frames" progress events report original bytes done so far. When
+# the frames are done, "compress", "mapping", "aes192" and "chacha20" end events
+# report each stage's total time (summed over workers) and input bytes.
+
+class Cancelled(Exception):
+    pass
+
+def run_stage(timings: dict, stage: str, fn, data, *args):
+    if timings is None:
+        return fn(data, *args)
+    start = time.perf_counter()
+    result = fn(data, *args)
+    seconds, nbytes = timings.get(stage, (0.0, 0))
+    timings[stage] = (seconds + time.perf_counter() - start, nbytes + len(data))
+    return result
+
+@contextlib.contextmanager
+def _stage(progress, stage: str, total: int = None):
+    # Yields a dict; set "bytes" on it when the bytes handled differ from total.
+    info = {"bytes": total or 0}
+    if progress is None:
+        yield info
+        return
+    progress({"event": "start", "stage": stage, "bytes": 0, "total": total, "elapsed": 0.0})
+    start = time.perf_counter()
+    yield info
+    progress({"event": "end", "stage": stage, "bytes": info["bytes"], "total": total,
+              "elapsed": time.perf_counter() - start})
 
-    stage0 = apply_mapping(stage1, unmap2)
-    original = apply_mapping(stage0, unmap1)
-    return original
+class _FrameMeter:
+    def __init__(self, progress, total: int = None):
+        self.progress = progress
+        self.total = total
+        self.done = 0
+        self.stages = {}
+        self.start = time.perf_counter()
+
+    def frame(self, size: int, timings: dict):
+        self.done += size
+        if self.progress is None:
+            return
+        for stage, (seconds, nbytes) in timings.items():
+            total_seconds, total_bytes = self.stages.get(stage, (0.0, 0))
+            self.stages[stage] = (total_seconds + seconds, total_bytes + nbytes)
+        self.progress({"event": "progress", "stage": "frames", "bytes": self.done, "total": self.total,
+                       "elapsed": time.perf_counter() - self.start})
+
+    def finish(self):
+        if self.progress is None:
+            return
+        for stage, (seconds, nbytes) in self.stages.items():
+            self.progress({"event": "end", "stage": stage, "bytes": nbytes, "total": None, "elapsed": seconds})
+
+class StageTimings:
+    # A progress= observer that totals "end" events per stage and forwards
+    # them to an optional metrics sink (any callable taking the event).
+    def __init__(self, sink=None):
+        self.sink = sink
+        self.stages = {}
+
+    def __call__(self, event: dict):
+        if event["event"] != "end":
+            return
+        entry = self.stages.setdefault(event["stage"], {"seconds": 0.0, "bytes": 0, "count": 0})
+        entry["seconds"] += event["elapsed"]
+        entry["bytes"] += event["bytes"]
+        entry["count"] += 1
+        if self.sink is not None:
+            self.sink(event)
+
+    def summary(self) -> dict:
+        return {stage: dict(entry, mb_s=_mb_per_s(entry["bytes"], entry["seconds"]))
+                for stage, entry in self.stages.items()}
+
+def _mb_per_s(nbytes: int, seconds: float):
+    return nbytes / (1 << 20) / seconds if nbytes and seconds else None
+
+def progress_percent(event: dict):
+    if event["event"] != "progress" or not event["total"]:
+        return None
+    return min(100, event["bytes"] * 100 // event["total"])
+
+def progress_text(event: dict) -> str:
+    if event["event"] == "start":
+        return f"{event['stage']}..."
+    if event["event"] == "end":
+        return f"{event['stage']} done in {event['elapsed']:.2f} s"
+    done = f"{event['bytes'] / (1 << 20):.1f}"
+    if event["total"]:
+        done += f" / {event['total'] / (1 << 20):.1f}"
+    return f"{done} MiB  {_mb_per_s(event['bytes'], event['elapsed']) or 0.0:.1f} MB/s"
+
+def progress_fanout(*callbacks):
+    callbacks = [cb for cb in callbacks if cb is not None]
+    if not callbacks:
+        return None
+    def progress(event: dict):
+        for cb in callbacks:
+            cb(event)
+    return progress
+
+# ===== M25 Frames (BT1 v2) =====
+# Every frame runs the same M25 stages as m25_encrypt, but the key and the
+# mappings are set up once per archive. The ChaCha20 nonce is the archive's
+# 8-byte nonce prefix followed by the frame index, and the AAD binds each
+# frame to the archive header and to its flags (final frame, member table).
+
+def frame_nonce(prefix: bytes, index: int) -> bytes:
+    return prefix + index.to_bytes(4, 'big')
+
+def frame_aad(header: bytes, flags: int) -> bytes:
+    return header + bytes([flags])
+
+def m25_encrypt_frame(data: bytes, key: bytes, table: bytes, nonce: bytes, aad: bytes, timings: dict = None) -> bytes:
+    stage1 = run_stage(timings, "mapping", apply_mapping, data, table)
+    stage2 = run_stage(timings, "aes192", aes192_encrypt, stage1, key)
+    return run_stage(timings, "chacha20", chacha20_encrypt, stage2, key, nonce, aad)
+
+def m25_decrypt_frame(data: bytes, key: bytes, untable: bytes, nonce: bytes, aad: bytes, timings: dict = None) -> bytes:
+    stage2 = run_stage(timings, "chacha20", chacha20_decrypt, data, key, nonce, aad)
+    stage1 = run_stage(timings, "aes192", aes192_decrypt, stage2, key)
+    return run_stage(timings, "mapping", apply_mapping, stage1, untable)
+
+def c20p_encrypt_frame(data: bytes, key: bytes, table: bytes, nonce: bytes, aad: bytes, timings: dict = None) -> bytes:
+    return run_stage(timings, "chacha20", chacha20_encrypt, data, key, nonce, aad)
+
+def c20p_decrypt_frame(data: bytes, key: bytes, untable: bytes, nonce: bytes, aad: bytes, timings: dict = None) -> bytes:
+    return run_stage(timings, "chacha20", chacha20_decrypt, data, key, nonce, aad)
+
+# ===== Encryptors =====
+# metadata["encryptor"] names how an archive's frames are sealed, and
+# unpack looks it up here; archives without one are "M25-v1". Entries are
+# (encrypt_frame, decrypt_frame, uses_maps), called like m25_encrypt_frame.
+# "C20P-v1" is the high-throughput profile: one ChaCha20-Poly1305 pass per
+# frame, with the same key, nonce and AAD as M25, and no mapping or AES.
+# v1 archives are whole-file M25 blobs and are always "M25-v1".
+
+ENCRYPTORS = {
+    "M25-v1": (m25_encrypt_frame, m25_decrypt_frame, True),
+    "C20P-v1": (c20p_encrypt_frame, c20p_decrypt_frame, False),
+}
+DEFAULT_ENCRYPTOR = "M25-v1"
+
+def get_encryptor(name: str):
+    if name not in ENCRYPTORS:
+        raise ValueError(f"Unknown encryptor: {name}")
+    return ENCRYPTORS[name]
+
+# ===== Compression Codecs =====
+# Codec names are "<name>" or "<name>-<level>" (e.g. "zlib-1", "lzma-9");
+# v2 archives record the codec in their metadata and default to "zlib".
+# "auto" modes sample the input and pick "store" for incompressible data,
+# otherwise their codec: "auto-fast" favours speed, "auto-small" ratio.
+
+def _zlib_compress(data: bytes, level: int = None) -> bytes:
+    return zlib.compress(data, -1 if level is None else level)
+
+def _bz2_compress(data: bytes, level: int = None) -> bytes:
+    return bz2.compress(data, 9 if level is None else level)
+
+def _lzma_compress(data: bytes, level: int = None) -> bytes:
+    return lzma.compress(data, preset=level)
+
+def _store(data: bytes, level: int = None) -> bytes:
+    return bytes(data)
+
+CODECS = {
+    "store": (_store, _store),
+    "zlib": (_zlib_compress, zlib.decompress),
+    "bz2": (_bz2_compress, bz2.decompress),
+    "lzma": (_lzma_compress, lzma.decompress),
+}
+# Levels each codec accepts; "store" takes none.
+CODEC_LEVELS = {"zlib": range(0, 10), "bz2": range(1, 10), "lzma": range(0, 10)}
+AUTO_CODECS = {"auto": "zlib", "auto-fast": "zlib-1", "auto-small": "lzma"}
+SAMPLE_SIZE = 16 << 10
+STORE_RATIO = 0.95
+
+@lru_cache(maxsize=None)
+def get_codec(name: str):
+    base, _, level = name.partition("-")
+    if base not in CODECS or (level and not (level.isdigit() and int(level) in CODEC_LEVELS.get(base, ()))):
+        raise ValueError(f"Unknown codec: {name}")
+    compress, decompress = CODECS[base]
+    level = int(level) if level else None
+    return (lambda data: compress(data, level)), decompress
+
+def byte_entropy(data: bytes) -> float:
+    if not data:
+        return 0.0
+    total = len(data)
+    return -sum(n / total * math.log2(n / total) for n in Counter(data).values())
+
+def _sample_offsets(length: int, size: int) -> list:
+    return sorted({0, length // 3, 2 * length // 3, max(0, length - size)})
+
+def _sample(src, size: int) -> bytes:
+    # Four slices spread over a file (its position is restored) or a buffer.
+    if isinstance(src, memoryview):
+        return b''.join(src[offset:offset + size] for offset in _sample_offsets(len(src), size))
+    position = src.tell()
+    parts = []
+    for offset in _sample_offsets(os.fstat(src.fileno()).st_size, size):
+        src.seek(offset)
+        parts.append(src.read(size))
+    src.seek(position)
+    return b''.join(parts)
+
+def choose_codec(src, mode: str = "auto") -> str:
+    # src is an open file or a memoryview of the input.
+    if mode not in AUTO_CODECS:
+        get_codec(mode)
+        return mode
+    sample = _sample(src, SAMPLE_SIZE)
+    if sample and byte_entropy(sample) > 7.0 and len(zlib.compress(sample, 1)) > STORE_RATIO * len(sample):
+        return "store"
+    return AUTO_CODECS[mode]
 
 # ===== BT1 Public API =====
+# v1 (BT1\x00): metadata followed by one m25_encrypt blob of the whole file.
+# v2 (BT1\x02): metadata followed by independent frames of at most
+# frame_size input bytes, each compressed and encrypted on its own:
+#   [>I ciphertext length][B flags][ciphertext + Poly1305 tag]
+# The last frame carries FRAME_FINAL so truncated archives are rejected.
+# Archives with "digest" in their metadata follow it with one FRAME_DIGEST
+# frame holding the SHA-256 of the original (multi-member archives keep a
+# "sha256" per member in their table instead).
+# Archives with "indexed" in their metadata end with a frame index for
+# random access: one >Q file offset per frame, then INDEX_FOOTER
+#   [>Q index offset][>Q original size][BT1X]
+# Multi-member (BT1\x03): metadata, then each member's frames (frame
+# indices keep counting across members), then the member table sealed as
+# one FRAME_TABLE frame, then MEMBERS_FOOTER
+#   [>Q table offset][>Q table frame index][BT1M]
+# Dedup (BT1\x04): see "Chunk Dedup" below.
 
-def bt1_pack_file(input_path: str, output_path: str, password: str = "test1"):
-    with open(input_path, 'rb') as f:
-        original = f.read()
-
-    compressed = zlib.compress(original)
-    metadata = {
-        "filename": os.path.basename(input_path),
-        "compressed_size": len(compressed),
-        "original_size": len(original),
-        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
-        "encryptor": "M25-v1"
+BT1_MAGIC_V1 = b'BT1\x00'
+BT1_MAGIC_V2 = b'BT1\x02'
+BT1_MAGIC_MULTI = b'BT1\x03'
+BT1_MAGIC_DEDUP = b'BT1\x04'
+FRAME_SIZE = 1 << 20
+FRAME_FINAL = 0x01
+FRAME_TABLE = 0x02
+FRAME_DIGEST = 0x04
+FRAME_HEADER = struct.Struct(">IB")
+INDEX_FOOTER = struct.Struct(">QQ4s")
+INDEX_MAGIC = b'BT1X'
+MEMBERS_FOOTER = struct.Struct(">QQ4s")
+MEMBERS_MAGIC = b'BT1M'
+FORMAT_NAMES = {BT1_MAGIC_V1: "v1", BT1_MAGIC_V2: "v2", BT1_MAGIC_MULTI: "multi", BT1_MAGIC_DEDUP: "dedup"}
+
+def _write_header(f, magic: bytes, metadata: dict) -> bytes:
+    metadata_compressed = zlib.compress(json.dumps(metadata).encode())
+    header = magic + struct.pack(">I", len(metadata_compressed)) + metadata_compressed
+    f.write(header)
+    return header
+
+def _read_header(f):
+    magic = f.read(4)
+    if magic not in FORMAT_NAMES:
+        raise ValueError("Invalid BT1 format.")
+    raw_len = f.read(4)
+    if len(raw_len) != 4:
+        raise ValueError("Truncated BT1 archive.")
+    meta_len = struct.unpack(">I", raw_len)[0]
+    metadata_compressed = f.read(meta_len)
+    if len(metadata_compressed) != meta_len:
+        raise ValueError("Truncated BT1 archive.")
+    try:
+        metadata = json.loads(zlib.decompress(metadata_compressed))
+    except (zlib.error, ValueError):
+        raise ValueError("Invalid BT1 metadata.") from None
+    if not isinstance(metadata, dict):
+        raise ValueError("Invalid BT1 metadata.")
+    return magic, metadata, magic + raw_len + metadata_compressed
+
+def _read_header_view(view: memoryview):
+    meta_len = struct.unpack_from(">I", view, 4)[0] if len(view) >= 8 else 0
+    return _read_header(io.BytesIO(view[:8 + meta_len]))
+
+def _map_archive(f) -> memoryview:
+    # Read-only view of the whole archive. Frames are sliced out of it
+    # instead of copied with f.read(); the map closes once the last slice
+    # is dropped.
+    return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+def _read_chunks(f, size: int):
+    # Yields (chunk, is_last); an empty input still produces one final frame.
+    chunk = f.read(size)
+    while True:
+        following = f.read(size)
+        yield chunk, not following
+        if not following:
+            return
+        chunk = following
+
+def _view_chunks(view: memoryview, size: int):
+    # Same contract as _read_chunks; the chunks are slices, not copies.
+    for start in range(0, max(len(view), 1), size):
+        yield view[start:start + size], start + size >= len(view)
+
+def _read_frames(view: memoryview, pos: int, index: int = 0):
+    while True:
+        if pos + FRAME_HEADER.size > len(view):
+            raise ValueError("Truncated BT1 archive.")
+        length, flags = FRAME_HEADER.unpack_from(view, pos)
+        pos += FRAME_HEADER.size
+        if pos + length > len(view):
+            raise ValueError("Truncated BT1 archive.")
+        yield index, flags, view[pos:pos + length]
+        if flags & FRAME_FINAL:
+            return
+        pos += length
+        index += 1
+
+@contextlib.contextmanager
+def _partial_output(output_path: str):
+    # Write next to the target and rename, so a failed or cancelled run
+    # never leaves a partial file under the real name.
+    partial_path = output_path + ".part"
+    try:
+        with open(partial_path, 'wb') as out:
+            yield out
+        os.replace(partial_path, output_path)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+class _BufferWriter:
+    # File-like writer over a bytearray, from offset 0. Bytes already in it
+    # are overwritten in place and it only grows past its current length, so
+    # a pre-sized bytearray is never reallocated. finish() trims it to what
+    # was written; discard() empties it.
+    def __init__(self, buffer: bytearray):
+        self.buffer = buffer
+        self.pos = 0
+
+    def write(self, data) -> int:
+        end = self.pos + len(data)
+        self.buffer[self.pos:end] = data
+        self.pos = end
+        return len(data)
+
+    def tell(self) -> int:
+        return self.pos
+
+    def finish(self) -> bytearray:
+        del self.buffer[self.pos:]
+        return self.buffer
+
+    def discard(self):
+        del self.buffer[:]
+
+# Frames are independent, so with workers > 1 they are sealed/opened on a
+# process pool. Results are consumed in frame order and at most 2 * workers
+# frames are in flight, so output bytes and peak memory do not depend on
+# the worker count beyond that window. workers may also be a FramePool: a
+# long-lived pool that many calls share (bt1daemon keeps one), instead of
+# one started per call.
+
+def _seal_frame(state: dict, index: int, chunk: bytes, flags: int):
+    nonce = frame_nonce(state["nonce"], index)
+    aad = frame_aad(state["header"], flags)
+    timings = {}
+    compressed = run_stage(timings, "compress", get_codec(state["codec"])[0], chunk)
+    sealed = get_encryptor(state["encryptor"])[0](compressed, state["key"], state["table"], nonce, aad, timings)
+    return sealed, flags, len(chunk), timings
+
+def _open_frame(state: dict, index: int, flags: int, sealed: bytes):
+    nonce = frame_nonce(state["nonce"], index)
+    aad = frame_aad(state["header"], flags)
+    timings = {}
+    compressed = get_encryptor(state["encryptor"])[1](sealed, state["key"], state["table"], nonce, aad, timings)
+    return run_stage(timings, "compress", get_codec(state["codec"])[1], compressed), timings
+
+def _init_frame_worker(aes_name: str):
+    if aes_name in AES_BACKENDS:
+        set_aes_backend(aes_name)
+        _aes_ecb()
+
+class FramePool:
+    # Workers are started by a forkserver, so a pool created in a
+    # multi-threaded process (the daemon) never forks a copy of another
+    # thread's held locks.
+    def __init__(self, workers: int):
+        import multiprocessing
+        self.workers = workers
+        self.executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("forkserver"),
+                                            initializer=_init_frame_worker, initargs=(_aes["name"],))
+
+    def close(self, wait: bool = True):
+        self.executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _parallel(workers) -> bool:
+    return isinstance(workers, FramePool) or workers > 1
+
+def _map_frames(fn, state: dict, frames, workers=1):
+    if not _parallel(workers):
+        for frame in frames:
+            yield fn(state, *frame)
+        return
+
+    if isinstance(workers, FramePool):
+        yield from _submit_frames(workers.executor, workers.workers, fn, state, frames)
+        return
+    # Workers take the backend the parent picked instead of probing again.
+    with ProcessPoolExecutor(workers, initializer=_init_frame_worker, initargs=(_aes["name"],)) as pool:
+        yield from _submit_frames(pool, workers, fn, state, frames)
+
+def _submit_frames(pool, workers: int, fn, state: dict, frames):
+    pending = deque()
+    try:
+        for frame in frames:
+            pending.append(pool.submit(fn, state, *frame))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        # A shared pool outlives this call: drop what it no longer needs.
+        for future in pending:
+            future.cancel()
+
+def _write_frames(f, chunks, state: dict, workers: int = 1, index: int = 0, meter: _FrameMeter = None,
+                  digest=None):
+    # chunks come from _read_chunks or _view_chunks; digest (a hashlib
+    # object) is fed the input. Returns the file offset of every frame
+    # written and the input size.
+    offsets, original_size = [], 0
+
+    def frames():
+        for i, (chunk, last) in enumerate(chunks, index):
+            if digest is not None:
+                digest.update(chunk)
+            yield i, chunk if not _parallel(workers) else bytes(chunk), FRAME_FINAL if last else 0
+
+    for sealed, flags, size, timings in _map_frames(_seal_frame, state, frames(), workers):
+        offsets.append(f.tell())
+        original_size += size
+        f.write(FRAME_HEADER.pack(len(sealed), flags))
+        f.write(sealed)
+        if meter is not None:
+            meter.frame(size, timings)
+    return offsets, original_size
+
+def _copy_frames(view: memoryview, pos: int, out, state: dict, workers: int = 1, index: int = 0,
+                 meter: _FrameMeter = None):
+    frames = _read_frames(view, pos, index)
+    if _parallel(workers):
+        # Worker processes need picklable bytes, not slices of the map.
+        frames = ((i, flags, bytes(data)) for i, flags, data in frames)
+    for data, timings in _map_frames(_open_frame, state, frames, workers):
+        out.write(data)
+        if meter is not None:
+            meter.frame(len(data), timings)
+
+def _archive_key(metadata: dict, password: str, session: KeySession = None) -> bytes:
+    # Archives packed with a KeySession record its salt as "session_salt".
+    salt = bytes.fromhex(metadata["salt"])
+    kdf = metadata.get("kdf", DEFAULT_KDF)
+    if "session_salt" not in metadata:
+        return derive_key(password, salt, kdf=kdf)
+    session_salt = bytes.fromhex(metadata["session_salt"])
+    if session is not None:
+        return session.file_key(salt, session_salt, kdf)
+    return hkdf_sha256(derive_key(password, session_salt, kdf=kdf), salt, FILE_KEY_INFO)
+
+def _new_archive_metadata(metadata: dict, frame_size: int, session: KeySession = None,
+                          encryptor: str = DEFAULT_ENCRYPTOR, kdf: dict = None) -> dict:
+    # With a session, the key comes from its master key, so its kdf applies.
+    if session is not None:
+        if kdf is not None and check_kdf(kdf) != session.kdf:
+            raise ValueError("kdf does not match the key session's KDF.")
+        kdf = session.kdf
+    metadata.update({
+        "encryptor": encryptor,
+        "kdf": check_kdf(dict(kdf or DEFAULT_KDF)),
+        "frame_size": frame_size,
+        "salt": os.urandom(16).hex(),
+        "nonce": os.urandom(8).hex()
+    })
+    if get_encryptor(encryptor)[2]:
+        metadata["maps"] = [new_seed(), new_seed()]
+    if session is not None:
+        metadata["session_salt"] = session.salt.hex()
+    return metadata
+
+def _frame_state(metadata: dict, header: bytes, password: str, session: KeySession = None, decrypt: bool = False) -> dict:
+    encryptor = metadata.get("encryptor", DEFAULT_ENCRYPTOR)
+    table, untable = mapping_tables(*metadata["maps"]) if get_encryptor(encryptor)[2] else (None, None)
+    if table is not None:
+        # Pick and load the AES backend now, not inside the first frame's
+        # aes192 stage, so --timings and progress events measure AES alone.
+        _aes_ecb()
+    return {
+        "encryptor": encryptor,
+        "key": _archive_key(metadata, password, session),
+        "table": untable if decrypt else table,
+        "nonce": bytes.fromhex(metadata["nonce"]),
+        "header": header,
+        "codec": metadata.get("codec", "zlib")
     }
 
-    metadata_json = json.dumps(metadata).encode()
-    metadata_compressed = zlib.compress(metadata_json)
-    encrypted = m25_encrypt(compressed, password)
+def _pack_single(f, chunks, metadata: dict, password: str, workers: int = 1, session: KeySession = None, progress=None):
+    # Writes a whole indexed v2 archive, with digest frame, for one input.
+    metadata["digest"] = "sha256"
+    digest = hashlib.sha256()
+    with _stage(progress, "pack", metadata["original_size"]) as info:
+        header = _write_header(f, BT1_MAGIC_V2, metadata)
+        with _stage(progress, "derive_key"):
+            state = _frame_state(metadata, header, password, session)
+
+        meter = _FrameMeter(progress, metadata["original_size"])
+        offsets, original_size = _write_frames(f, chunks, state, workers, 0, meter, digest)
+        meter.finish()
+        info["bytes"] = original_size
+    sealed, flags, _, _ = _seal_frame(state, len(offsets), digest.digest(), FRAME_DIGEST)
+    f.write(FRAME_HEADER.pack(len(sealed), flags))
+    f.write(sealed)
+    index_offset = f.tell()
+    f.write(struct.pack(f">{len(offsets)}Q", *offsets))
+    f.write(INDEX_FOOTER.pack(index_offset, original_size, INDEX_MAGIC))
+
+def bt1_pack_file(input_path: str, output_path: str, password: str = "test1", frame_size: int = FRAME_SIZE, workers: int = 1,
+                  session: KeySession = None, progress=None, codec: str = "auto", encryptor: str = DEFAULT_ENCRYPTOR,
+                  kdf: dict = None):
+    with open(input_path, 'rb') as src, _partial_output(output_path) as f:
+        metadata = _new_archive_metadata({
+            "filename": os.path.basename(input_path),
+            "original_size": os.fstat(src.fileno()).st_size,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")
+        }, frame_size, session, encryptor, kdf)
+        metadata["indexed"] = True
+        metadata["codec"] = choose_codec(src, codec)
+        _pack_single(f, _read_chunks(src, frame_size), metadata, password, workers, session, progress)
+
+def bt1_pack_bytes(data, password: str = "test1", filename: str = "data.bin", frame_size: int = FRAME_SIZE,
+                   workers: int = 1, session: KeySession = None, progress=None, codec: str = "auto",
+                   out: bytearray = None, encryptor: str = DEFAULT_ENCRYPTOR, kdf: dict = None) -> bytearray:
+    # data is any buffer (bytes, bytearray, memoryview, mmap, ...). The
+    # archive is the same as bt1_pack_file would write for a file called
+    # filename; it is written into out (see _BufferWriter) or a new bytearray.
+    view = memoryview(data).cast("B")
+    writer = _BufferWriter(bytearray() if out is None else out)
+    metadata = _new_archive_metadata({
+        "filename": filename,
+        "original_size": len(view),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }, frame_size, session, encryptor, kdf)
+    metadata["indexed"] = True
+    metadata["codec"] = choose_codec(view, codec)
+    try:
+        _pack_single(writer, _view_chunks(view, frame_size), metadata, password, workers, session, progress)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.finish()
+
+def bt1_pack_many(input_paths: list, output_path: str, password: str = "test1", frame_size: int = FRAME_SIZE,
+                  workers: int = 1, session: KeySession = None, progress=None, codec: str = "auto",
+                  encryptor: str = DEFAULT_ENCRYPTOR, kdf: dict = None):
+    names = [os.path.basename(path) for path in input_paths]
+    if len(set(names)) != len(names):
+        raise ValueError("Duplicate member names.")
+    total = sum(os.path.getsize(path) for path in input_paths)
+
+    with _partial_output(output_path) as f, _stage(progress, "pack", total) as info:
+        metadata = _new_archive_metadata({"created": time.strftime("%Y-%m-%dT%H:%M:%S")}, frame_size, session,
+                                         encryptor, kdf)
+        header = _write_header(f, BT1_MAGIC_MULTI, metadata)
+        with _stage(progress, "derive_key"):
+            state = _frame_state(metadata, header, password, session)
+
+        members, index = [], 0
+        meter = _FrameMeter(progress, total)
+        for path, name in zip(input_paths, names):
+            digest = hashlib.sha256()
+            with open(path, 'rb') as src:
+                member_codec = choose_codec(src, codec)
+                member_state = dict(state, codec=member_codec)
+                offsets, original_size = _write_frames(f, _read_chunks(src, frame_size), member_state, workers, index,
+                                                       meter, digest)
+            members.append({
+                "name": name,
+                "codec": member_codec,
+                "sha256": digest.hexdigest(),
+                "original_size": original_size,
+                "stored_size": f.tell() - offsets[0],
+                "first_frame": index,
+                "offsets": offsets
+            })
+            index += len(offsets)
+        meter.finish()
+        info["bytes"] = meter.done
 
-    with open(output_path, 'wb') as f:
-        f.write(b'BT1\x00')
-        f.write(struct.pack(">I", len(metadata_compressed)))
-        f.write(metadata_compressed)
-        f.write(encrypted)
+        table_offset = f.tell()
+        sealed, flags, _, _ = _seal_frame(state, index, json.dumps(members).encode(), FRAME_TABLE)
+        f.write(FRAME_HEADER.pack(len(sealed), flags))
+        f.write(sealed)
+        f.write(MEMBERS_FOOTER.pack(table_offset, index, MEMBERS_MAGIC))
 
-def bt1_unpack_file(input_path: str, output_folder: str, password: str = "test1"):
+def _read_members(f, state: dict) -> list:
+    f.seek(-MEMBERS_FOOTER.size, os.SEEK_END)
+    table_offset, index, magic = MEMBERS_FOOTER.unpack(f.read(MEMBERS_FOOTER.size))
+    if magic != MEMBERS_MAGIC:
+        raise ValueError("Invalid BT1 member table.")
+    f.seek(table_offset)
+    length, flags = FRAME_HEADER.unpack(f.read(FRAME_HEADER.size))
+    if flags != FRAME_TABLE:
+        raise ValueError("Invalid BT1 member table.")
+    return json.loads(_open_frame(state, index, flags, f.read(length))[0])
+
+def _extract_member(view: memoryview, state: dict, member: dict, output_folder: str, workers: int = 1,
+                    meter: _FrameMeter = None) -> str:
+    output_path = os.path.join(output_folder, os.path.basename(member["name"]))
+    state = dict(state, codec=member.get("codec", state["codec"]))
+    with _partial_output(output_path) as out:
+        _copy_frames(view, member["offsets"][0], out, state, workers, member["first_frame"], meter)
+    return output_path
+
+def bt1_inspect(archive_path: str) -> dict:
+    # Header only: no password, no key derivation, nothing past the metadata.
+    with open(archive_path, 'rb') as f:
+        magic, metadata, header = _read_header(f)
+        archive_size = os.fstat(f.fileno()).st_size
+    return {"format": FORMAT_NAMES[magic], "header_size": len(header), "archive_size": archive_size,
+            "metadata": metadata}
+
+def bt1_list(archive_path: str, password: str = "test1", session: KeySession = None) -> list:
+    with open(archive_path, 'rb') as f:
+        magic, metadata, header = _read_header(f)
+        if magic != BT1_MAGIC_MULTI:
+            return [{"name": metadata["filename"], "original_size": metadata["original_size"],
+                     "codec": metadata.get("codec", "zlib")}]
+        members = _read_members(f, _frame_state(metadata, header, password, session, decrypt=True))
+    return [{"name": m["name"], "original_size": m["original_size"], "stored_size": m["stored_size"],
+             "codec": m.get("codec", "zlib")} for m in members]
+
+def bt1_extract(archive_path: str, member: str, output_folder: str, password: str = "test1", workers: int = 1,
+                session: KeySession = None, progress=None) -> str:
+    with open(archive_path, 'rb') as f:
+        magic, metadata, header = _read_header(f)
+        if magic != BT1_MAGIC_MULTI:
+            raise ValueError("Not a multi-member BT1 archive.")
+        with _stage(progress, "derive_key"):
+            state = _frame_state(metadata, header, password, session, decrypt=True)
+        for entry in _read_members(f, state):
+            if entry["name"] == member:
+                with _stage(progress, "extract", entry["original_size"]) as info:
+                    meter = _FrameMeter(progress, entry["original_size"])
+                    output_path = _extract_member(_map_archive(f), state, entry, output_folder, workers, meter)
+                    meter.finish()
+                    info["bytes"] = meter.done
+                return output_path
+    raise KeyError(f"No member named {member!r}.")
+
+def _unpack_single(view: memoryview, out, magic: bytes, metadata: dict, header: bytes, password: str,
+                   workers: int = 1, session: KeySession = None, progress=None):
+    # Decrypts a v1 or v2 archive held in view and writes the original to out.
+    total = metadata["original_size"]
+    with _stage(progress, "unpack", total) as info:
+        if magic == BT1_MAGIC_V1:
+            _check_v1_encryptor(metadata)
+            with _stage(progress, "m25_decrypt", metadata["compressed_size"]):
+                decrypted = m25_decrypt(view[len(header):], password, metadata.get("kdf"))
+            with _stage(progress, "compress", total):
+                out.write(zlib.decompress(decrypted))
+        else:
+            with _stage(progress, "derive_key"):
+                state = _frame_state(metadata, header, password, session, decrypt=True)
+            meter = _FrameMeter(progress, total)
+            _copy_frames(view, len(header), out, state, workers, 0, meter)
+            meter.finish()
+            info["bytes"] = meter.done
+
+def _check_v1_encryptor(metadata: dict):
+    if metadata.get("encryptor", DEFAULT_ENCRYPTOR) != "M25-v1":
+        raise ValueError(f"Unsupported encryptor for BT1 v1: {metadata['encryptor']}")
+
+def bt1_unpack_file(input_path: str, output_folder: str, password: str = "test1", workers: int = 1,
+                    session: KeySession = None, progress=None):
     with open(input_path, 'rb') as f:
-        if f.read(4) != b'BT1\x00':
-            raise ValueError("Invalid BT1 format.")
+        magic, metadata, header = _read_header(f)
+        if magic == BT1_MAGIC_MULTI:
+            with _stage(progress, "derive_key"):
+                state = _frame_state(metadata, header, password, session, decrypt=True)
+            members = _read_members(f, state)
+            total = sum(member["original_size"] for member in members)
+            view = _map_archive(f)
+            with _stage(progress, "unpack", total) as info:
+                meter = _FrameMeter(progress, total)
+                for member in members:
+                    _extract_member(view, state, member, output_folder, workers, meter)
+                meter.finish()
+                info["bytes"] = meter.done
+            return
+
+        with _partial_output(os.path.join(output_folder, metadata["filename"])) as out:
+            if magic == BT1_MAGIC_DEDUP:
+                _unpack_dedup(_map_archive(f), out, metadata, header, password, os.path.dirname(input_path),
+                              workers, session, progress)
+            else:
+                _unpack_single(_map_archive(f), out, magic, metadata, header, password, workers, session, progress)
+
+def bt1_unpack_bytes(data, password: str = "test1", workers: int = 1, session: KeySession = None, progress=None,
+                     out: bytearray = None) -> bytearray:
+    # data is any buffer holding a v1, v2 or self-contained dedup archive;
+    # frames are decrypted from slices of it. The original is written into out (see
+    # _BufferWriter), which is left empty if decryption fails, or into a new
+    # bytearray allocated at the original size up front.
+    view = memoryview(data).cast("B")
+    magic, metadata, header = _read_header_view(view)
+    if magic == BT1_MAGIC_MULTI:
+        raise ValueError("Multi-member archives need bt1_extract.")
+    writer = _BufferWriter(bytearray(metadata["original_size"]) if out is None else out)
+    try:
+        if magic == BT1_MAGIC_DEDUP:
+            _unpack_dedup(view, writer, metadata, header, password, None, workers, session, progress)
+        else:
+            _unpack_single(view, writer, magic, metadata, header, password, workers, session, progress)
+    except BaseException:
+        writer.discard()
+        raise
+    return writer.finish()
+
+# ===== Chunk Dedup =====
+# BT1\x04 archives split the input into content-defined chunks and store
+# each distinct chunk once, as a frame sealed like a v2 frame. Chunks that
+# other dedup archives already hold (a previous version passed as base=,
+# or every dedup archive in a store= directory) are not stored again: the
+# chunk table points into the archive that holds them. Those archives are
+# listed in metadata["sources"] as paths relative to this archive, with
+# their salt as id, and must be present to unpack. The chunk table is
+# sealed as one FRAME_TABLE frame after the chunk frames, then DEDUP_FOOTER
+#   [>Q table offset][>Q table frame index][BT1D]
+# Table: [>II distinct chunks, recipe length], one CHUNK_RECORD per
+# distinct chunk [sha256][>H source (0 = this archive)][>I frame index]
+# [>Q offset][>I size], then the recipe: one >I chunk number per chunk of
+# the input, in order.
+#
+# Boundaries: the bytes of (region * CHUNK_MULTIPLIER) form a rolling hash
+# of the 32 bytes before each position, computed for a whole region by one
+# big-int multiply. A chunk ends at the first position past CHUNK_MIN where
+# two consecutive hash bytes are zero, or at CHUNK_MAX. Boundaries depend
+# only on nearby bytes, so an insertion only changes the chunks around it.
+
+DEDUP_FOOTER = struct.Struct(">QQ4s")
+DEDUP_MAGIC = b'BT1D'
+CHUNK_RECORD = struct.Struct(">32sHIQI")
+CHUNK_MIN = 16 << 10
+CHUNK_MAX = 256 << 10
+CHUNK_MULTIPLIER = 0xcd3b21fb2da888bda86338deea7736b0ae57a5bd97d10123baff6a869c807e93
+_CHUNK_LEAD = 48
+_CHUNK_STEP = 64 << 10
+
+def cdc_chunks(view: memoryview, min_size: int = CHUNK_MIN, max_size: int = CHUNK_MAX):
+    # Yields (start, end) for each chunk of view.
+    start = 0
+    while start < len(view):
+        end = min(start + max_size, len(view))
+        base = start + min_size - _CHUNK_LEAD
+        while base + _CHUNK_LEAD < end:
+            top = min(base + _CHUNK_LEAD + _CHUNK_STEP, end)
+            region = view[base:top]
+            hashes = (int.from_bytes(region, 'little') * CHUNK_MULTIPLIER).to_bytes(len(region) + 32, 'little')
+            hit = hashes.find(b'\x00\x00', _CHUNK_LEAD, len(region))
+            if hit >= 0:
+                end = base + hit + 1
+                break
+            base = top - _CHUNK_LEAD
+        yield start, end
+        start = end
+
+def _read_dedup_table(view: memoryview, state: dict):
+    if len(view) < DEDUP_FOOTER.size:
+        raise ValueError("Truncated BT1 archive.")
+    table_offset, index, magic = DEDUP_FOOTER.unpack_from(view, len(view) - DEDUP_FOOTER.size)
+    if magic != DEDUP_MAGIC or table_offset + FRAME_HEADER.size > len(view):
+        raise ValueError("Invalid BT1 chunk table.")
+    length, flags = FRAME_HEADER.unpack_from(view, table_offset)
+    if flags != FRAME_TABLE:
+        raise ValueError("Invalid BT1 chunk table.")
+    start = table_offset + FRAME_HEADER.size
+    table = memoryview(_open_frame(state, index, flags, view[start:start + length])[0])
+    count, recipe_length = struct.unpack_from(">II", table)
+    records_end = 8 + count * CHUNK_RECORD.size
+    records = list(CHUNK_RECORD.iter_unpack(table[8:records_end]))
+    return records, struct.unpack_from(f">{recipe_length}I", table, records_end)
+
+def _source_path(archive_dir: str, name: str) -> str:
+    return os.path.normpath(os.path.join(archive_dir, name))
+
+def _open_dedup(path: str, password: str, session: KeySession = None) -> dict:
+    with open(path, 'rb') as f:
+        magic, metadata, header = _read_header(f)
+        if magic != BT1_MAGIC_DEDUP:
+            raise ValueError(f"Not a BT1 dedup archive: {path}")
+        view = _map_archive(f)
+    state = _frame_state(metadata, header, password, session, decrypt=True)
+    return {"metadata": metadata, "view": view, "state": state}
+
+def _known_chunks(paths: list, password: str, session: KeySession = None, optional: list = ()) -> dict:
+    # sha256 -> (holder path, holder id, frame index, offset, size) for every
+    # chunk the given dedup archives can point to. Archives in optional (the
+    # store) that do not open with this password, or are damaged, are skipped.
+    from cryptography.exceptions import InvalidTag
+    known = {}
+    for path in list(paths) + list(optional):
+        try:
+            archive = _open_dedup(path, password, session)
+        except (InvalidTag, ValueError):
+            if path in paths:
+                raise
+            continue
+        archive_dir = os.path.dirname(path)
+        holders = [(os.path.abspath(path), archive["metadata"]["salt"])]
+        holders += [(os.path.abspath(_source_path(archive_dir, source["name"])), source["id"])
+                    for source in archive["metadata"].get("sources", [])]
+        try:
+            records, _ = _read_dedup_table(archive["view"], archive["state"])
+        except (InvalidTag, ValueError, struct.error):
+            if path in paths:
+                raise
+            continue
+        for digest, source, index, offset, size in records:
+            holder, holder_id = holders[source]
+            if digest not in known and os.path.exists(holder):
+                known[digest] = (holder, holder_id, index, offset, size)
+    return known
+
+def _store_archives(store: str, exclude: str) -> list:
+    paths = []
+    for name in sorted(os.listdir(store)):
+        path = os.path.join(store, name)
+        if name.endswith(".bt1") and os.path.abspath(path) != exclude and os.path.isfile(path):
+            try:
+                if bt1_inspect(path)["format"] == "dedup":
+                    paths.append(path)
+            except (OSError, ValueError):
+                pass
+    return paths
+
+def bt1_pack_dedup(input_path: str, output_path: str, password: str = "test1", base=None, store: str = None,
+                   workers: int = 1, session: KeySession = None, progress=None, codec: str = "auto",
+                   encryptor: str = DEFAULT_ENCRYPTOR, kdf: dict = None) -> dict:
+    # base is one previous dedup archive (or a list of them); store is a
+    # directory whose dedup archives are all used. Returns chunk counts and
+    # how many bytes were stored vs reused.
+    output_abs = os.path.abspath(output_path)
+    bases = [base] if isinstance(base, str) else list(base or [])
+    store_paths = _store_archives(store, output_abs) if store else []
+    with _stage(progress, "index"):
+        known = _known_chunks(bases, password, session, store_paths)
+
+    with open(input_path, 'rb') as src, _partial_output(output_path) as f:
+        original_size = os.fstat(src.fileno()).st_size
+        view = _map_archive(src) if original_size else memoryview(b'')
+        metadata = _new_archive_metadata({
+            "filename": os.path.basename(input_path),
+            "original_size": original_size,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S")
+        }, CHUNK_MAX, session, encryptor, kdf)
+        metadata["codec"] = choose_codec(view, codec)
+        metadata["chunking"] = [CHUNK_MIN, CHUNK_MAX]
+
+        with _stage(progress, "pack", original_size) as info:
+            # Hash pass: only chunks nobody holds yet are compressed and sealed.
+            chunks, recipe, numbers, new, sources = [], [], {}, [], {}
+            with _stage(progress, "chunk", original_size):
+                for start, end in cdc_chunks(view):
+                    digest = hashlib.sha256(view[start:end]).digest()
+                    if digest not in numbers:
+                        numbers[digest] = len(chunks)
+                        if digest in known:
+                            holder, holder_id, index, offset, size = known[digest]
+                            source = sources.setdefault((holder, holder_id), len(sources) + 1)
+                            chunks.append([digest, source, index, offset, size])
+                        else:
+                            new.append((len(chunks), start, end))
+                            chunks.append([digest, 0, 0, 0, end - start])
+                    recipe.append(numbers[digest])
+            output_dir = os.path.dirname(output_abs)
+            metadata["sources"] = [{"name": os.path.relpath(holder, output_dir), "id": holder_id}
+                                   for holder, holder_id in sources]
+
+            header = _write_header(f, BT1_MAGIC_DEDUP, metadata)
+            with _stage(progress, "derive_key"):
+                state = _frame_state(metadata, header, password, session)
+            stored_bytes = sum(end - start for _, start, end in new)
+            meter = _FrameMeter(progress, stored_bytes)
+            frames = ((i, view[start:end] if not _parallel(workers) else bytes(view[start:end]), 0)
+                      for i, (_, start, end) in enumerate(new))
+            sealed_frames = _map_frames(_seal_frame, state, frames, workers)
+            for index, ((number, _, _), (sealed, flags, size, timings)) in enumerate(zip(new, sealed_frames)):
+                chunks[number][2:4] = [index, f.tell()]
+                f.write(FRAME_HEADER.pack(len(sealed), flags))
+                f.write(sealed)
+                meter.frame(size, timings)
+            meter.finish()
+            info["bytes"] = original_size
+
+        table = b''.join([struct.pack(">II", len(chunks), len(recipe)),
+                          *(CHUNK_RECORD.pack(*chunk) for chunk in chunks),
+                          struct.pack(f">{len(recipe)}I", *recipe)])
+        table_offset = f.tell()
+        sealed, flags, _, _ = _seal_frame(state, len(new), table, FRAME_TABLE)
+        f.write(FRAME_HEADER.pack(len(sealed), flags))
+        f.write(sealed)
+        f.write(DEDUP_FOOTER.pack(table_offset, len(new), DEDUP_MAGIC))
+    return {"chunks": len(recipe), "distinct": len(chunks), "stored": len(new), "stored_bytes": stored_bytes,
+            "reused_bytes": original_size - stored_bytes, "sources": len(sources)}
+
+def _open_chunk(states: list, source: int, index: int, flags: int, sealed: bytes):
+    return _open_frame(states[source], index, flags, sealed)
 
-        meta_len = struct.unpack(">I", f.read(4))[0]
-        metadata = json.loads(zlib.decompress(f.read(meta_len)))
-        encrypted = f.read()
+def _sealed_chunk(views: list, record: tuple, workers: int = 1):
+    _, source, index, offset, _ = record
+    length, flags = FRAME_HEADER.unpack_from(views[source], offset)
+    start = offset + FRAME_HEADER.size
+    sealed = views[source][start:start + length]
+    return source, index, flags, sealed if not _parallel(workers) else bytes(sealed)
 
-    decrypted = m25_decrypt(encrypted, password)
-    original = zlib.decompress(decrypted)
+def _dedup_sources(view: memoryview, metadata: dict, header: bytes, password: str, archive_dir: str = None,
+                   session: KeySession = None):
+    # Views and decrypt states of this archive (source 0) and its sources.
+    views = [view]
+    states = [_frame_state(metadata, header, password, session, decrypt=True)]
+    for source in metadata.get("sources", []):
+        if archive_dir is None:
+            raise ValueError("This dedup archive needs its source archives; unpack it from a file.")
+        archive = _open_dedup(_source_path(archive_dir, source["name"]), password, session)
+        if archive["metadata"]["salt"] != source["id"]:
+            raise ValueError(f"BT1 source archive does not match: {source['name']}")
+        views.append(archive["view"])
+        states.append(archive["state"])
+    return views, states
 
-    output_path = os.path.join(output_folder, metadata["filename"])
-    with open(output_path, 'wb') as f:
-        f.write(original)
+def _unpack_dedup(view: memoryview, out, metadata: dict, header: bytes, password: str, archive_dir: str = None,
+                  workers: int = 1, session: KeySession = None, progress=None):
+    total = metadata["original_size"]
+    with _stage(progress, "unpack", total) as info:
+        with _stage(progress, "derive_key"):
+            views, states = _dedup_sources(view, metadata, header, password, archive_dir, session)
+        records, recipe = _read_dedup_table(view, states[0])
+
+        # Runs of the same chunk (zero-filled regions) are decrypted once.
+        runs = [(number, len(list(group))) for number, group in itertools.groupby(recipe)]
+        frames = (_sealed_chunk(views, records[number], workers) for number, _ in runs)
+        meter = _FrameMeter(progress, total)
+        for (number, repeat), (data, timings) in zip(runs, _map_frames(_open_chunk, states, frames, workers)):
+            if hashlib.sha256(data).digest() != records[number][0]:
+                raise ValueError("Corrupt BT1 chunk.")
+            for _ in range(repeat):
+                out.write(data)
+                meter.frame(len(data), timings)
+                timings = {}
+        meter.finish()
+        info["bytes"] = meter.done
+
+# ===== Verify =====
+# bt1_verify reads an archive the way unpack does but writes nothing. With
+# check_digest (the default) every frame is fully decrypted and
+# decompressed, and the result is compared with the stored sizes and
+# SHA-256 digests ("absent" for archives packed before digests were
+# recorded). Without it only the Poly1305 tags are checked: the ChaCha20
+# stage runs and AES, mapping and decompression are skipped.
+
+def _auth_frame(state: dict, index: int, flags: int, sealed: bytes):
+    timings = {}
+    run_stage(timings, "chacha20", chacha20_decrypt, sealed, state["key"], frame_nonce(state["nonce"], index),
+              frame_aad(state["header"], flags))
+    return len(sealed), timings
+
+def _auth_chunk(states: list, source: int, index: int, flags: int, sealed: bytes):
+    return _auth_frame(states[source], index, flags, sealed)
+
+def _verify_frames(view: memoryview, pos: int, state: dict, index: int, check_digest: bool, workers: int,
+                   meter: _FrameMeter):
+    # Frames from pos through the final one. Returns (end offset, frame
+    # count, bytes checked, sha256 of the original when check_digest).
+    end, count, nbytes, digest = pos, 0, 0, hashlib.sha256()
+
+    def frames():
+        nonlocal end
+        for i, flags, sealed in _read_frames(view, pos, index):
+            end += FRAME_HEADER.size + len(sealed)
+            yield i, flags, sealed if not _parallel(workers) else bytes(sealed)
+
+    for data, timings in _map_frames(_open_frame if check_digest else _auth_frame, state, frames(), workers):
+        if check_digest:
+            digest.update(data)
+            data = len(data)
+        count += 1
+        nbytes += data
+        meter.frame(data, timings)
+    return end, count, nbytes, digest
+
+def _check(ok: bool, what: str):
+    if not ok:
+        raise ValueError(f"BT1 {what} mismatch.")
+
+def bt1_verify(archive_path: str, password: str = "test1", workers: int = 1, session: KeySession = None,
+               progress=None, check_digest: bool = True) -> dict:
+    # Raises like bt1_unpack_file on a bad password or a damaged archive.
+    with open(archive_path, 'rb') as f:
+        magic, metadata, header = _read_header(f)
+        return _verify_view(_map_archive(f), f, magic, metadata, header, password, os.path.dirname(archive_path),
+                            workers, session, progress, check_digest)
+
+def bt1_verify_bytes(data, password: str = "test1", workers: int = 1, session: KeySession = None, progress=None,
+                     check_digest: bool = True) -> dict:
+    # bt1_verify for an archive held in any buffer; like bt1_unpack_bytes,
+    # dedup archives must be self-contained.
+    view = memoryview(data).cast("B")
+    magic, metadata, header = _read_header_view(view)
+    f = io.BytesIO(view) if magic == BT1_MAGIC_MULTI else None
+    return _verify_view(view, f, magic, metadata, header, password, None, workers, session, progress, check_digest)
+
+def _verify_view(view: memoryview, f, magic: bytes, metadata: dict, header: bytes, password: str, archive_dir: str,
+                 workers: int, session: KeySession, progress, check_digest: bool) -> dict:
+    # f is only read for the member table of multi-member archives.
+    result = {"format": FORMAT_NAMES[magic], "frames": 0, "bytes": 0,
+              "digest": "absent" if check_digest else "skipped"}
+    total = metadata.get("original_size") if check_digest else len(view)
+    with _stage(progress, "verify", total) as info:
+        meter = _FrameMeter(progress, total)
+        if magic == BT1_MAGIC_V1:
+            _check_v1_encryptor(metadata)
+            blob = view[len(header):]
+            if check_digest:
+                result["bytes"] = len(zlib.decompress(m25_decrypt(blob, password, metadata.get("kdf"))))
+                _check(result["bytes"] == metadata["original_size"], "size")
+            else:
+                key = derive_key(password, blob[8:24], kdf=metadata.get("kdf"))
+                chacha20_decrypt(blob[36:], key, blob[24:36])
+                result["bytes"] = len(blob)
+            result["frames"] = 1
+
+        elif magic == BT1_MAGIC_V2:
+            with _stage(progress, "derive_key"):
+                state = _frame_state(metadata, header, password, session, decrypt=True)
+            end, result["frames"], result["bytes"], digest = _verify_frames(view, len(header), state, 0,
+                                                                            check_digest, workers, meter)
+            if "digest" in metadata:
+                length, flags = FRAME_HEADER.unpack_from(view, end)
+                start = end + FRAME_HEADER.size
+                _check(flags == FRAME_DIGEST, "digest frame")
+                stored = _open_frame(state, result["frames"], flags, view[start:start + length])[0]
+                if check_digest:
+                    _check(stored == digest.digest(), "digest")
+                    result["digest"] = "ok"
+            if check_digest:
+                _check(result["bytes"] == metadata["original_size"], "size")
+
+        elif magic == BT1_MAGIC_MULTI:
+            with _stage(progress, "derive_key"):
+                state = _frame_state(metadata, header, password, session, decrypt=True)
+            members = _read_members(f, state)
+            digests = 0
+            for member in members:
+                member_state = dict(state, codec=member.get("codec", state["codec"]))
+                _, frames, nbytes, digest = _verify_frames(view, member["offsets"][0], member_state,
+                                                           member["first_frame"], check_digest, workers, meter)
+                result["frames"] += frames
+                result["bytes"] += nbytes
+                if check_digest:
+                    _check(nbytes == member["original_size"], f"size of {member['name']}")
+                    if "sha256" in member:
+                        _check(digest.hexdigest() == member["sha256"], f"digest of {member['name']}")
+                        digests += 1
+            if check_digest and members and digests == len(members):
+                result["digest"] = "ok"
+
+        else:
+            with _stage(progress, "derive_key"):
+                views, states = _dedup_sources(view, metadata, header, password, archive_dir, session)
+            records, recipe = _read_dedup_table(view, states[0])
+            frames = (_sealed_chunk(views, record, workers) for record in records)
+            checked = _map_frames(_open_chunk if check_digest else _auth_chunk, states, frames, workers)
+            for record, (data, timings) in zip(records, checked):
+                if check_digest:
+                    _check(hashlib.sha256(data).digest() == record[0], "chunk digest")
+                    data = len(data)
+                result["frames"] += 1
+                result["bytes"] += data
+                meter.frame(data, timings)
+            if check_digest:
+                _check(sum(records[number][4] for number in recipe) == metadata["original_size"], "size")
+                result["bytes"] = metadata["original_size"]
+                result["digest"] = "ok"
+        meter.finish()
+        info["bytes"] = result["bytes"]
+    return result
+
+# ===== Random Access =====
+# BT1Reader decrypts only the frames that cover what is read, so the cost
+# of a read depends on its length and not on the archive size.
+
+def _read_index(f, metadata: dict):
+    if metadata.get("indexed"):
+        footer_offset = f.seek(-INDEX_FOOTER.size, os.SEEK_END)
+        index_offset, original_size, magic = INDEX_FOOTER.unpack(f.read(INDEX_FOOTER.size))
+        if magic != INDEX_MAGIC or index_offset > footer_offset:
+            raise ValueError("Invalid BT1 frame index.")
+        count = (footer_offset - index_offset) // 8
+        f.seek(index_offset)
+        return list(struct.unpack(f">{count}Q", f.read(count * 8))), original_size
+
+    # Archives without an index: walk the frame headers, skipping payloads.
+    offsets = []
+    while True:
+        offsets.append(f.tell())
+        raw = f.read(FRAME_HEADER.size)
+        if len(raw) != FRAME_HEADER.size:
+            raise ValueError("Truncated BT1 archive.")
+        length, flags = FRAME_HEADER.unpack(raw)
+        f.seek(length, os.SEEK_CUR)
+        if flags & FRAME_FINAL:
+            return offsets, None
+
+class BT1Reader(io.BufferedIOBase):
+    def __init__(self, path: str, password: str = "test1", session: KeySession = None):
+        self._pos = 0
+        self._cached = (None, b'')
+        self._f = open(path, 'rb')
+        try:
+            magic, self.metadata, header = _read_header(self._f)
+            if magic != BT1_MAGIC_V2:
+                raise ValueError("Random access needs a BT1 v2 archive.")
+            self._state = _frame_state(self.metadata, header, password, session, decrypt=True)
+            self._frame_size = self.metadata["frame_size"]
+            self._offsets, self.size = _read_index(self._f, self.metadata)
+            if self.size is None:
+                last = len(self._offsets) - 1
+                self.size = last * self._frame_size + len(self._frame(last))
+        except BaseException:
+            self._f.close()
+            raise
+
+    def _frame(self, index: int) -> bytes:
+        if self._cached[0] == index:
+            return self._cached[1]
+        self._f.seek(self._offsets[index])
+        length, flags = FRAME_HEADER.unpack(self._f.read(FRAME_HEADER.size))
+        data, _ = _open_frame(self._state, index, flags, self._f.read(length))
+        if not flags & FRAME_FINAL and len(data) != self._frame_size:
+            raise ValueError("Corrupt BT1 frame.")
+        self._cached = (index, data)
+        return data
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._pos
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._pos
+        elif whence == os.SEEK_END:
+            offset += self.size
+        if offset < 0:
+            raise ValueError("Negative seek position.")
+        self._pos = offset
+        return self._pos
+
+    def read(self, size: int = -1) -> bytes:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        end = self.size if size is None or size < 0 else min(self.size, self._pos + size)
+        parts = []
+        while self._pos < end:
+            index, start = divmod(self._pos, self._frame_size)
+            part = self._frame(index)[start:start + end - self._pos]
+            if not part:
+                break
+            parts.append(part)
+            self._pos += len(part)
+        return b''.join(parts)
+
+    read1 = read
+
+    def close(self):
+        if not self.closed:
+            self._f.close()
+            self._cached = (None, b'')
+        super().close()
+
+def bt1_open(path: str, password: str = "test1", session: KeySession = None) -> BT1Reader:
+    return BT1Reader(path, password, session)
+
+def bt1_read_range(path: str, offset: int, length: int, password: str = "test1", session: KeySession = None) -> bytes:
+    with BT1Reader(path, password, session) as reader:
+        reader.seek(offset)
+        return reader.read(length)
 
 # ===== CLI usable =====
 if __name__ == "__main__":
     import sys
-    if len(sys.argv) != 4:
-        print("Usage:")
-        print("  Pack  : python bt1module.py pack <input_file> <output_file.bt1>")
-        print("  Unpack: python bt1module.py unpack <input.bt1> <output_folder>")
-        exit(1)
-
-    mode = sys.argv[1]
-    if mode == "pack":
-        bt1_pack_file(sys.argv[2], sys.argv[3])
-        print(f"[✔] Packed: {sys.argv[3]}")
-    elif mode == "unpack":
-        bt1_unpack_file(sys.argv[2], sys.argv[3])
-        print(f"[✔] Unpacked to: {sys.argv[3]}")
-    else:
-        print("Invalid syntax. Use 'pack' or 'unpack'.")
+    import argparse
+    parser = argparse.ArgumentParser(prog="bt1module.py", description="Pack and unpack .bt1 archives.")
+    commands = parser.add_subparsers(dest="mode", required=True)
+
+    pack_cmd = commands.add_parser("pack", help="pack <input_file> <output_file.bt1>")
+    pack_cmd.add_argument("input_file")
+    pack_cmd.add_argument("output_file")
+
+    unpack_cmd = commands.add_parser("unpack", help="unpack <input.bt1> <output_folder>")
+    unpack_cmd.add_argument("input_file")
+    unpack_cmd.add_argument("output_folder")
+
+    inspect_cmd = commands.add_parser("inspect", help="inspect <input.bt1>... (header only, no password)")
+    inspect_cmd.add_argument("input_files", nargs="+")
+    inspect_cmd.add_argument("--json", action="store_true", help="one JSON object per archive")
+
+    pack_cmd.add_argument("--codec", default="auto",
+                          help="auto, auto-fast, auto-small, store, zlib[-0..9], bz2[-1..9] or lzma[-0..9] (default: auto)")
+    pack_cmd.add_argument("--encryptor", default=DEFAULT_ENCRYPTOR, choices=list(ENCRYPTORS),
+                          help=f"frame encryption profile (default: {DEFAULT_ENCRYPTOR}; C20P-v1 is a single AEAD pass)")
+    pack_cmd.add_argument("--kdf", default=os.environ.get("BT1_KDF"),
+                          help="pbkdf2:<iterations> or scrypt:<n>[:<r>:<p>] (default: $BT1_KDF or pbkdf2:100000)")
+    pack_cmd.add_argument("--dedup", action="store_true", help="store content-defined chunks once (BT1 dedup format)")
+    pack_cmd.add_argument("--base", action="append", help="previous dedup archive to reuse chunks from (implies --dedup)")
+    pack_cmd.add_argument("--store", help="directory of dedup archives to reuse chunks from (implies --dedup)")
+
+    pack_tree_cmd = commands.add_parser("pack-tree", help="pack-tree <dir|glob>... <output_dir>")
+    unpack_tree_cmd = commands.add_parser("unpack-tree", help="unpack-tree <dir|glob>... <output_dir>")
+    for cmd in (pack_tree_cmd, unpack_tree_cmd):
+        cmd.add_argument("sources", nargs="*", help="directories, files or glob patterns")
+        cmd.add_argument("output_dir")
+        cmd.add_argument("--manifest", help="file listing one input path or pattern per line")
+        cmd.add_argument("--base", help="root that relative output paths are mirrored from (default: cwd)")
+        cmd.add_argument("--force", action="store_true", help="redo files whose output is already up to date")
+    pack_tree_cmd.add_argument("--codec", default="auto")
+    pack_tree_cmd.add_argument("--encryptor", default=DEFAULT_ENCRYPTOR, choices=list(ENCRYPTORS))
+    pack_tree_cmd.add_argument("--kdf", default=os.environ.get("BT1_KDF"))
+
+    calibrate_cmd = commands.add_parser("calibrate", help="pick KDF parameters for a target derivation time on this host")
+    calibrate_cmd.add_argument("--kdf", default="pbkdf2", choices=["pbkdf2", "scrypt"])
+    calibrate_cmd.add_argument("--target-ms", type=float, default=500, help="derivation time to aim for (default: 500)")
+
+    verify_cmd = commands.add_parser("verify", help="verify <input.bt1|dir|glob>... (checks archives, writes nothing)")
+    verify_cmd.add_argument("sources", nargs="*", help="archives, directories or glob patterns")
+    verify_cmd.add_argument("--manifest", help="file listing one archive path or pattern per line")
+    verify_cmd.add_argument("--quick", action="store_true", help="check authentication tags only, skip digests")
+
+    for cmd in (pack_cmd, unpack_cmd, pack_tree_cmd, unpack_tree_cmd, verify_cmd):
+        cmd.add_argument("--password", default="test1")
+        cmd.add_argument("--jobs", "-j", type=int, default=1, help="worker processes (default: 1)")
+    for cmd in (pack_cmd, unpack_cmd):
+        cmd.add_argument("--timings", action="store_true", help="print per-stage time and throughput")
+
+    args = parser.parse_args()
+    if getattr(args, "kdf", None) and args.mode != "calibrate":
+        try:
+            args.kdf = parse_kdf(args.kdf)
+        except ValueError as e:
+            parser.error(str(e))
+    if getattr(args, "codec", None) and args.codec not in AUTO_CODECS:
+        try:
+            get_codec(args.codec)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.mode == "calibrate":
+        kdf, seconds = calibrate_kdf(args.kdf, args.target_ms / 1000)
+        print(f"[✔] {kdf_text(kdf)} takes {seconds * 1000:.0f} ms here (target {args.target_ms:.0f} ms)")
+        print(f"    pack with --kdf {kdf_text(kdf)} or export BT1_KDF={kdf_text(kdf)}")
+        sys.exit(0)
+
+    if args.mode in ("pack-tree", "unpack-tree", "verify"):
+        import bt1batch
+        if args.mode == "verify":
+            summary = bt1batch.verify_tree(args.sources, args.password, args.jobs, args.manifest, not args.quick)
+        elif args.mode == "pack-tree":
+            summary = bt1batch.pack_tree(args.sources, args.output_dir, args.password, args.jobs, args.manifest,
+                                         args.base, args.codec, args.force, encryptor=args.encryptor, kdf=args.kdf)
+        else:
+            summary = bt1batch.unpack_tree(args.sources, args.output_dir, args.password, args.jobs, args.manifest,
+                                           args.base, args.force)
+        print(f"[{'✘' if summary['failed'] else '✔'}] {bt1batch.format_summary(summary)}")
+        sys.exit(1 if summary["failed"] else 0)
+
+    if args.mode == "inspect":
+        failed = 0
+        for path in args.input_files:
+            try:
+                info = bt1_inspect(path)
+            except (OSError, ValueError) as e:
+                failed += 1
+                print(f"[✘] {path}: {e}", file=sys.stderr)
+                continue
+            if args.json:
+                print(json.dumps(dict(info, path=path)))
+                continue
+            print(f"{path}: BT1 {info['format']}, {info['archive_size']} bytes, header {info['header_size']} bytes")
+            for key, value in info["metadata"].items():
+                print(f"  {key:<16} {value}")
+        sys.exit(1 if failed else 0)
+
+    def show_progress(event):
+        if event["event"] == "progress" and sys.stderr.isatty():
+            print(f"\r  {progress_percent(event) or 0:3d}%  {progress_text(event)}   ", end="", file=sys.stderr, flush=True)
+
+    timings = StageTimings() if args.timings else None
+    progress = progress_fanout(show_progress, timings)
+
+    if args.mode == "pack" and (args.dedup or args.base or args.store):
+        stats = bt1_pack_dedup(args.input_file, args.output_file, args.password, args.base, args.store,
+                               workers=args.jobs, progress=progress, codec=args.codec, encryptor=args.encryptor,
+                               kdf=args.kdf)
+        message = (f"[✔] Packed: {args.output_file} — {stats['chunks']} chunks, {stats['stored']} stored "
+                   f"({stats['stored_bytes'] / (1 << 20):.1f} MiB), {stats['reused_bytes'] / (1 << 20):.1f} MiB reused")
+    elif args.mode == "pack":
+        bt1_pack_file(args.input_file, args.output_file, args.password, workers=args.jobs, progress=progress,
+                      codec=args.codec, encryptor=args.encryptor, kdf=args.kdf)
+        message = f"[✔] Packed: {args.output_file}"
+    elif args.mode == "unpack":
+        bt1_unpack_file(args.input_file, args.output_folder, args.password, workers=args.jobs, progress=progress)
+        message = f"[✔] Unpacked to: {args.output_folder}"
+
+    if sys.stderr.isatty():
+        print(file=sys.stderr)
+    print(message)
 
+    if timings is not None:
+        for stage, entry in timings.summary().items():
+            rate = f"{entry['mb_s']:10.1f} MB/s" if entry["mb_s"] else ""
+            print(f"  {stage:<12} {entry['seconds']:8.3f} s {rate}")
@@ -0,0 +1,101 @@
+import os
+import sys
+import pytest
+from cryptography.exceptions import InvalidTag
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bt1module
+
+# ===== Archive known answers =====
+# Archives written by earlier versions of bt1module, all holding PLAINTEXT
+# under password "test1". Each must keep unpacking, from a file and from
+# memory, with nothing but the password:
+#   V1   BT1\x00 single blob (the original format)
+#   V2   BT1\x02 frames of 40 bytes, key from PBKDF2(salt), no KDF field
+#   V2S  as V2, packed with a KeySession (session_salt + HKDF file key)
+#   V2K  session salt and metadata["kdf"] = PBKDF2 with 2000 iterations,
+#        zlib codec, frame index and digest frame
+
+PLAINTEXT = b"BT1 known-answer archive.\nLine two of the plaintext, long enough to span several small frames.\n"
+
+V1_ARCHIVE = bytes.fromhex(
+    "4254310000000071789c3d8c410e82301000bf42f66c4dbb0ac6fe819b77d2c0621aa125db8d510c7fc7bd709d99cc0f"
+    "c638510a3381afe015e42c1f8153057d9e17a65268e84a5cd5dedd1f678ecf98c274c05a5ba62034e8012d36c659e36e"
+    "0f7bf578f1d8e88d52cfdf45326bd3626dde0eb61d8c0f24dc3f8793c9642e1cd8d52ad0eb21d2a8f9fa3d198063c3de"
+    "0b0b7d7a0a7eadcf0027ecc28f7f957a7244c0912c5bc3aaed9e1279c066ff802e0358ee9391233499cebe19aef5dc56"
+    "436beb80e6f29c7a8b5d5efe01297e18eee32b2d086d6965257e285b6dc815ff94657f0b22f5c9fb3ec05cc8dba2a314"
+    "c97f2300166afabcf208e39fbe471fdde386723eebe9a27cfd7538c9d8"
+)
+V2_ARCHIVE = bytes.fromhex(
+    "42543102000000b4789c358ed16ac3300c457f25f8b9199212db75fea16f7d2b65288e5c4213a738a6b41bfbf7d983bd"
+    "8973af8ef4adc2bc48e455d4d0a83be78ffccaead0a82dcdb739f2f2b9cf5f3573ba409f84b34cb54a40a64568d19ea1"
+    "1fa81bc8d635893ebd1f794bb57322dd3eb1e290ca857f550f85acfcd8cb7c414ba81d583a34e89cb59d017b2df9ce4b"
+    "ae8ea3e331907872463a63a660908fbd0e932f1411aa3d6ed1fffdef6504b686345018059cfaf90500013dd100000050"
+    "009f661b43e6f0a017c53af9083afc18b015b4f112bb7845e31dd45079e40b83c10deb6058efd97240164a4746ed7a3b"
+    "78d62101dd95f91a943a86755c390e096abd1d1dceb2a2ff3ce84b170734af75de0000005000801506ae44540ad746db"
+    "354bbab8939e12bf57bcb9aa1bff0f2bc3f37f74dbfa28cb3792c09c05e250c189ca32210ca3d2483a2b5eee9c556f00"
+    "5f3a23dc77c09df866f2851e464332b49cebe55a249900000030011769d9c11d93101d38a343646725bdcbfb031405ac"
+    "3187a47135b366b70486386d362c1697dc5f331a38a7958365fd99"
+)
+V2S_ARCHIVE = bytes.fromhex(
+    "42543102000000d1789c358f4d6ac3301085af62bc8ecb68342359be4376dd8512646b5c4c1d3948a2a42dbd7ba54276"
+    "c3fbf986f7d3afdb2ed1dfa49fbafec39797f228fda9eb8fb4bd6fd1efd7bc7d37cf71159724be4868510434838241d9"
+    "57a009f584b6d5242ee9eb5e8ed43267e4e15335794df5c3134550959bbfe77a5f148125240673ea46e39c4336f6ad06"
+    "b2df4b8304702be871356696b080a3608323af48d4689196868f475cfe07200bcfa300cc5aac046866969cb7235e9f40"
+    "02631d8460ade699036b44a7c9330badacebbadf3f38b24c3100000050008b2c420405f9aa3fa6fc4983393b3e27efbd"
+    "f2cf08509cb6d5f3b9149bea452f53321fc96bf84c48661e3128e59b79511505bd53e924ddf2fab7da6bde4b6f4f264a"
+    "64e9a29a68011caff4ed57764f79000000500099da3a09d6dfcc440e148270a7568a5bb823a79b9ff6e38ecc6dd056c7"
+    "74b676f1b33f66cff666ea24352dbeccac834d077c56140e1dfaec96e6c5ae6e02862d0aba43df7df4bdeffbb04a8e40"
+    "4b777b00000030010d19a37aefbb6e1f662efdcd78baf9375860e4ad1c8e1257ab2fa8ee296f6e5e88a6a3365daf2117"
+    "de587f6f3de8c280"
+)
+V2K_ARCHIVE = bytes.fromhex(
+    "425431020000010a789c35904b6ec3300c44af12781d17fad0faf80ed9755714016d51a910470e24b54813e4ee958c66"
+    "c9c7190ec947e7c342112fd48dbbee8ce5addc4ab7df756b0aa7107139e6706f3d3b543827c242ae490513aae7ace7fa"
+    "9dc128e42874b3519cd3efb5aca9690e62e87f78c367e72b7874afa0eb5489e8f3178a4135412894b08435e6da168cb1"
+    "67853e55f96b016095645c4af373a168d69320704060809803a3915950e82667dbc8b8c6790bf35e58ab154d80de73bf"
+    "e55df0da923ef860a51a4073bedf5969144869cc674ba29ceb3ac757a2936c363078ed08e5e40d38ae3948e0d20bace5"
+    "76447474dbde53d237b57fad8ee6e6be2f616a0a174e94b779ffa73fff00cae96ce0000000500094b8815e12f3f2e973"
+    "9eabc47286aa243f3f03f56b7a51c50aa3d8a6616a19142fb08e3fd65ba134017ac481e1e853e7811b3377243dafb8de"
+    "5098582f8c865e42a70809b89ec0791c09d681fb773bea00000050000b4d27392be3393abeb840ba7bcc7a864debced6"
+    "a75c337eafaf9e6377920b15a263104adfd9f7ded1b4b5943966ab3899c643544b3af837ffa57e3190558bf4dbb3dbb1"
+    "6f2051809017b0bb139521220000003001fb1e477455fdeca0e9e5bda19707afa2bf9f7827363727deb9f788d0aaa6c8"
+    "3ab68af9785434164c6e32948dacb8298a00000040041bd3696c6af635bcf3392cdbebee75d70e760ed765ac8b81d4e5"
+    "22fb6698246485ca3f94bfdc5d9b47f591bf2da90a3ca83fadf9248d501959d1d85247baaea000000000000001120000"
+    "00000000016700000000000001bc0000000000000236000000000000005f42543158"
+)
+
+ARCHIVES = {"v1": V1_ARCHIVE, "v2": V2_ARCHIVE, "v2s": V2S_ARCHIVE, "v2k": V2K_ARCHIVE}
+
+@pytest.mark.parametrize("name", sorted(ARCHIVES))
+def test_unpack_file(name, tmp_path):
+    archive = tmp_path / "kat.bt1"
+    archive.write_bytes(ARCHIVES[name])
+    out = tmp_path / "out"
+    out.mkdir()
+    bt1module.bt1_unpack_file(str(archive), str(out), "test1")
+    assert (out / "kat.txt").read_bytes() == PLAINTEXT
+
+@pytest.mark.parametrize("name", sorted(ARCHIVES))
+def test_unpack_bytes(name):
+    assert bt1module.bt1_unpack_bytes(ARCHIVES[name], "test1") == PLAINTEXT
+
+@pytest.mark.parametrize("name", sorted(ARCHIVES))
+def test_wrong_password_fails(name):
+    with pytest.raises((InvalidTag, ValueError)):
+        bt1module.bt1_unpack_bytes(ARCHIVES[name], "wrong")
+
+@pytest.mark.parametrize("name, frames", [("v2", 3), ("v2s", 3), ("v2k", 3)])
+def test_v2_frame_layout(name, frames):
+    result = bt1module.bt1_verify_bytes(ARCHIVES[name], "test1")
+    assert (result["format"], result["frames"], result["bytes"]) == ("v2", frames, len(PLAINTEXT))
+    assert result["digest"] == ("ok" if name == "v2k" else "absent")
+
+def test_header_kdf_is_used(tmp_path):
+    archive = tmp_path / "kat.bt1"
+    archive.write_bytes(V2K_ARCHIVE)
+    metadata = bt1module.bt1_inspect(str(archive))["metadata"]
+    assert metadata["kdf"] == {"name": "pbkdf2-sha256", "iterations": 2000}
+    # A session with the default KDF must still derive the archive's own key.
+    with bt1module.KeySession("test1") as session:
+        assert bt1module.bt1_unpack_bytes(V2K_ARCHIVE, "test1", session=session) == PLAINTEXT
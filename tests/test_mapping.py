@@ -0,0 +1,77 @@
+import os
+import sys
+import random
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import bt1module
+
+# ===== Legacy dict engine =====
+# The byte mapping as the format was defined: global random.seed(seed) +
+# random.shuffle, stored as a dict. Every M25 archive stores only its two
+# seeds, so the table engine must keep deriving exactly these permutations.
+
+def legacy_create_mapping(seed) -> dict:
+    random.seed(seed)
+    original = list(range(256))
+    shuffled = original[:]
+    random.shuffle(shuffled)
+    return dict(zip(original, shuffled))
+
+def legacy_inverse_mapping(mapping: dict) -> dict:
+    return {v: k for k, v in mapping.items()}
+
+def legacy_apply_mapping(data: bytes, mapping: dict) -> bytes:
+    return bytes([mapping[b] for b in data])
+
+SEEDS = [1, 2, 42, 1337, 2**16 + 1, 123456789, 2**31 - 1]
+DATA = bytes(range(256)) * 4 + b"The quick brown fox jumps over the lazy dog."
+
+# First 16 table bytes for two seeds, taken from the dict engine.
+KNOWN_PREFIXES = {1: "e9fe42b70fd3eade77bbb09f13861124", 2**31 - 1: "570060220bd3433b8d2cc9bb4ec4639f"}
+
+# m25_encrypt(KNOWN_PLAINTEXT, "test1") from the dict-engine module.
+KNOWN_PLAINTEXT = b"BT1 known-answer plaintext: mapping, AES-192 and ChaCha20 stages.\n"
+KNOWN_BLOB = bytes.fromhex(
+    "23e72bf503e1f313b813041dcab9e7b42d9f71ade1688e9418629b06ef407aff965a5b8f778fd3e3946ee9e884f3d269"
+    "8e4fa78e099570a7b7dc806a22549d75d5ae38c1bd13c7aba9406a48f770382b10647fbe3504ce9f3d1030b6e67c860a"
+    "04a783e28fd76708fcd8d5e9c46d5f3df270170944f20aa3d3fa772a1716957487722b84")
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_table_matches_dict_engine(seed):
+    legacy = legacy_create_mapping(seed)
+    assert bt1module.create_mapping(seed) == bytes(legacy[b] for b in range(256))
+
+@pytest.mark.parametrize("seed", sorted(KNOWN_PREFIXES))
+def test_known_tables(seed):
+    assert bt1module.create_mapping(seed)[:16].hex() == KNOWN_PREFIXES[seed]
+
+@pytest.mark.parametrize("seed1, seed2", list(zip(SEEDS, reversed(SEEDS))))
+def test_merged_tables_round_trip_with_dict_engine(seed1, seed2):
+    map1, map2 = legacy_create_mapping(seed1), legacy_create_mapping(seed2)
+    table, untable = bt1module.mapping_tables(seed1, seed2)
+    mapped = legacy_apply_mapping(legacy_apply_mapping(DATA, map1), map2)
+    assert bt1module.apply_mapping(DATA, table) == mapped
+    assert bt1module.apply_mapping(mapped, untable) == DATA
+    restored = legacy_apply_mapping(legacy_apply_mapping(bt1module.apply_mapping(DATA, table),
+                                                         legacy_inverse_mapping(map2)), legacy_inverse_mapping(map1))
+    assert restored == DATA
+
+def test_mapping_does_not_touch_global_random():
+    random.seed(99)
+    expected = random.random()
+    random.seed(99)
+    bt1module.create_mapping.cache_clear()
+    bt1module.create_mapping(7)
+    assert random.random() == expected
+
+def test_decrypts_dict_engine_blob():
+    assert bt1module.m25_decrypt(KNOWN_BLOB, "test1") == KNOWN_PLAINTEXT
+
+def test_dict_engine_decrypts_new_blob():
+    blob = bt1module.m25_encrypt(KNOWN_PLAINTEXT, "test1")
+    seed1, seed2 = int.from_bytes(blob[0:4], "big"), int.from_bytes(blob[4:8], "big")
+    key = bt1module.derive_key("test1", blob[8:24])
+    stage1 = bytes(bt1module.aes192_decrypt(bt1module.chacha20_decrypt(blob[36:], key, blob[24:36]), key))
+    unmapped = legacy_apply_mapping(stage1, legacy_inverse_mapping(legacy_create_mapping(seed2)))
+    assert legacy_apply_mapping(unmapped, legacy_inverse_mapping(legacy_create_mapping(seed1))) == KNOWN_PLAINTEXT